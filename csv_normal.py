@@ -7,27 +7,50 @@
 
     ※セパレータはデフォルトでカンマとなっているが、任意に指定可能で正規表現も指定できる
     ※フィールドの左右の空白は無視する('  hoge fuga  ' -> 'hoge fuga')
+    ※ダブルクォートで囲まれたフィールドはカンマや改行を含められる('"hoge, fuga"' -> 'hoge, fuga')
 """
 
 __all__ = ['TwoDimArray', 'PrintContextManager', 'Wrapper', 'Magic', #class
-           'load', 'csv2tda', 'nd2tda', 'df2tda', 'list2tda', 'dict2tda', 'str2list', 'list2str', 'row2column', 'chk_border', #public function
+           'load', 'load_iter', 'tail', 'load_sample', 'groupby_iter', 'csv2tda', 'nd2tda', 'df2tda', 'list2tda', 'dict2tda', 'str2list', 'list2str', 'row2column', 'chk_border', #public function
            ]
 __version__ = '3.3.4'
 __author__ = 'ShiraiTK'
 
-from collections import Counter, defaultdict
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
-from itertools import chain, product, zip_longest
+from fractions import Fraction
+from itertools import accumulate, chain, islice, product, repeat, zip_longest
+from operator import itemgetter, mul
 from statistics import mean, median, variance, stdev #平均: mean, 中央値: median, 分散: variance, 標準偏差: stdev
+import bz2
+import codecs
 import copy
+import csv as _csv #モジュール名csvはcsv_normalのエイリアスとして使われることが多いので_csvとする
 import functools
+import gzip
+import hashlib
 import inspect
 import io
+import locale
+import lzma
+import math
+import mmap
 import os
+import pickle
+import random
 import re
 import subprocess
+import tempfile
 import unicodedata
 
+try:
+    from re import _parser as _re_parser #Python3.11以降
+except ImportError:
+    import sre_parse as _re_parser
+
 #ファイルを開くコマンド
 if os.name == 'nt': #Windows
     _OPEN_CMD = ['cmd.exe', '/C', 'start']
@@ -446,6 +469,587 @@ class Magic(object):
         #Magic.is_magic(m.data)
         return m
 
+#------------------------------
+# _ArrayColumnクラス
+#------------------------------
+class _ArrayColumn(object):
+    """
+    数値の列をarray.arrayで保持する読み出し専用の列(TwoDimArray.compact_columns参照)
+        values: 数値のarray.array(intだけの列は'q'、floatを含む列は'd')
+        missing: 空('')のフィールドのビット列(valuesの値は0)
+        ints: 'd'の列でintのフィールドのビット列('q'の列はNone)
+        others: 数値以外のフィールド(ヘッダーなど)の辞書{インデックス: フィールド値}(valuesの値は0)
+
+        インデックスでアクセスすると元のフィールド値を返し、sliceでアクセスするとリストを返す
+    """
+    __slots__ = ('values', 'missing', 'ints', 'others')
+
+    def __init__(self):
+        self.values = array('q')
+        self.missing = bytearray()
+        self.ints = None
+        self.others = {}
+
+    @classmethod
+    def from_column(cls, column):
+        """
+        列(column)から_ArrayColumnを作成する
+            数値の列でなければNoneを返す
+        """
+        array_column = cls()
+        if array_column.extend(column):
+            return array_column
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self.values))
+            if step == 1:
+                return self._tolist(start, max(start, stop))
+            return self._tolist(0, len(self.values))[idx]
+
+        value = self.values[idx]
+        if idx < 0:
+            idx += len(self.values)
+
+        if self.others and idx in self.others:
+            return self.others[idx]
+        if _get_bit(self.missing, idx):
+            return ''
+        if self.ints is not None and _get_bit(self.ints, idx):
+            return int(value)
+        return value
+
+    def __iter__(self):
+        return iter(self._tolist(0, len(self.values)))
+
+    def __repr__(self):
+        return f'_ArrayColumn({self._tolist(0, len(self.values))})'
+
+    def _tolist(self, start, stop):
+        """
+        [start:stop]のフィールド値のリストを返す
+        """
+        column = self.values[start:stop].tolist()
+        if self.ints is not None:
+            for idx in _iter_bits(self.ints, start, stop):
+                column[idx-start] = int(column[idx-start])
+        for idx in _iter_bits(self.missing, start, stop):
+            column[idx-start] = ''
+        for idx, field in self.others.items():
+            if start <= idx < stop:
+                column[idx-start] = field
+        return column
+
+    def extend(self, column):
+        """
+        列(column)のフィールドを最後尾に追加する
+            数値以外のフィールド(空('')を除く)が多い場合は追加せずにFalseを返す
+        """
+        start = len(self.values)
+        field_types = set(map(type, column))
+
+        #intだけ、floatだけの列はarray.arrayで一括して追加する
+        if field_types == {int}:
+            if self.values.typecode == 'q':
+                try:
+                    self.values.extend(column)
+                    return True
+                except OverflowError: #64bitに収まらないint
+                    del self.values[start:]
+            elif -_FLOAT_INT_MAX <= min(column) and max(column) <= _FLOAT_INT_MAX:
+                self.values.extend(map(float, column))
+                _set_bit_range(self.ints, start, start + len(column))
+                return True
+        elif field_types == {float}:
+            self._to_float()
+            self.values.extend(column)
+            return True
+
+        #フィールド毎に振り分けて追加する
+        values = []
+        ints = []
+        missing = []
+        others = {}
+        for idx, field in enumerate(column, start):
+            field_type = type(field)
+            if field_type is int and _INT64_MIN <= field <= _INT64_MAX:
+                values.append(field)
+                ints.append(idx)
+            elif field_type is float:
+                values.append(field)
+            elif field_type is str and field == '':
+                values.append(0)
+                missing.append(idx)
+            else:
+                values.append(0)
+                others[idx] = field
+
+        if len(ints) + len(missing) + len(others) < len(values): #floatがある
+            self._to_float()
+        if self.ints is not None:
+            for idx in ints:
+                if abs(values[idx-start]) > _FLOAT_INT_MAX: #floatで正確に表せないint
+                    others[idx] = values[idx-start]
+                    values[idx-start] = 0
+
+        if len(self.others) + len(others) > (start + len(values)) // 16 + 1:
+            return False
+
+        self.values.extend(values)
+        if self.ints is not None:
+            _set_bits(self.ints, ints)
+        _set_bits(self.missing, missing)
+        self.others.update(others)
+        return True
+
+    def _to_float(self):
+        """
+        'q'のvaluesを'd'に変換する
+            元のintのフィールドはintsのビットを立て、floatで正確に表せないintはothersに移す
+        """
+        if self.ints is not None:
+            return
+
+        values = self.values
+        self.ints = bytearray()
+        _set_bit_range(self.ints, 0, len(values))
+        if values and (min(values) < -_FLOAT_INT_MAX or max(values) > _FLOAT_INT_MAX):
+            for idx, value in enumerate(values):
+                if abs(value) > _FLOAT_INT_MAX:
+                    self.others[idx] = value
+                    values[idx] = 0
+        self.values = array('d', values)
+
+#_ArrayColumnで保持できる値の範囲
+_INT64_MIN = -2**63
+_INT64_MAX = 2**63 - 1
+_FLOAT_INT_MAX = 2**53 #floatで正確に表せるintの最大値
+
+#------------------------------
+# _CategoryColumnクラス
+#------------------------------
+class _CategoryColumn(object):
+    """
+    少数の文字列が繰り返される列をコード(整数)と値のリストで保持する読み出し専用の列(TwoDimArray.categorize_columns参照)
+        codes: 各フィールドの値のコードのarray.array(値の種類数に合わせて'B', 'H', 'I'とする)
+        categories: 値のリスト(コードが値のインデックス)
+        lookup: 値からコードを引く辞書{値: コード}
+
+        インデックスでアクセスすると元のフィールド値を返し、sliceでアクセスするとリストを返す
+    """
+    __slots__ = ('codes', 'categories', 'lookup')
+
+    def __init__(self):
+        self.codes = array('B')
+        self.categories = []
+        self.lookup = {}
+
+    @classmethod
+    def from_column(cls, column):
+        """
+        列(column)から_CategoryColumnを作成する
+            文字列だけの列で値の種類が少なくなければNoneを返す
+        """
+        category_column = cls()
+        if category_column.extend(column):
+            return category_column
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return list(map(self.categories.__getitem__, self.codes[idx]))
+        return self.categories[self.codes[idx]]
+
+    def __iter__(self):
+        return map(self.categories.__getitem__, self.codes)
+
+    def __repr__(self):
+        return f'_CategoryColumn({list(self)})'
+
+    def extend(self, column):
+        """
+        列(column)のフィールドを最後尾に追加する
+            文字列以外のフィールドがある、または値の種類が多い場合は追加せずにFalseを返す
+        """
+        if not set(map(type, column)) <= {str}:
+            return False
+
+        lookup = self.lookup
+        new_values = [value for value in dict.fromkeys(column) if value not in lookup] #出現順に新しい値のコードを決める
+        if len(self.categories) + len(new_values) > (len(self.codes) + len(column)) // 2 + 1:
+            return False
+
+        for value in new_values:
+            lookup[value] = len(self.categories)
+            self.categories.append(value)
+        self._fit_codes()
+        self.codes.extend(map(lookup.__getitem__, column))
+        return True
+
+    def replace(self, before_value, after_value):
+        """
+        before_valueの値をafter_valueにする(値が変わるだけでコードの並びはそのまま)
+            after_valueが既にある値ならば、before_valueのコードをafter_valueのコードに付け替えて統合する
+        """
+        before_code = self.lookup.pop(before_value)
+        after_code = self.lookup.get(after_value)
+        if after_code is None:
+            self.lookup[after_value] = before_code
+            self.categories[before_code] = after_value
+        else:
+            code_map = list(range(len(self.categories)))
+            code_map[before_code] = after_code
+            self.codes = array(self.codes.typecode, map(code_map.__getitem__, self.codes))
+
+    def _fit_codes(self):
+        """
+        値の種類数に合わせてcodesの型を大きくする
+        """
+        for typecode, size in (('B', 2**8), ('H', 2**16), ('I', 2**32)):
+            if len(self.categories) <= size:
+                break
+        if self.codes.typecode != typecode and self.codes.itemsize < array(typecode).itemsize:
+            self.codes = array(typecode, self.codes)
+
+#------------------------------
+# _LazyRowsクラス
+#------------------------------
+class _LazyRows(object):
+    """
+    csvファイルの行をアクセスされた時に区切り・型変換して返す読み取り専用の行のシーケンス(load(lazy=True)の行指向データ)
+        ファイルはmmapで開いたまま保持し(close()で閉じる)、ヘッダーより後の各行の開始位置をarray('q')で保持する
+        ヘッダーまでの行(head)は変換済みのリストで保持する
+        変換した行は保持しない(アクセスのたびに変換する)
+    """
+    def __init__(self, path, mm, head, offsets, sep, encoding, header=None, dtypes=None, col_idxs=None):
+        self.path = path #読み込んでいるファイルのパス(saveで同じファイルに保存するかの判定、groupbyなどで各プロセスが開くファイル)
+        self.mm = mm
+        self.head = head
+        self.offsets = offsets
+        self.sep = sep
+        self.encoding = encoding
+        self.header = header #ヘッダーの行(dtypesの列の指定の解決に使う)
+        self.dtypes = dtypes
+        self.col_idxs = col_idxs #usecolsで選択した列のファイルの列インデックス(Noneなら全ての列)
+        self.select = None if col_idxs is None else _usecols_selector(col_idxs) #usecolsの列を取り出す関数
+        self.convert = _dtypes_converter(header, dtypes, col_idxs) #行のリストをdtypesで変換する関数
+        #文字列のフィールドがファイルの文字列のまま(dtypesに関数が無い)か(may_contain参照)
+        self.raw_text = not any(callable(dtype) and dtype not in (str, int, float) for dtype in (dtypes or {}).values())
+
+    def __len__(self):
+        return len(self.head) + len(self.offsets)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            row_idxs = range(len(self))[idx]
+            if row_idxs.step != 1:
+                return [self[row_idx] for row_idx in row_idxs]
+            if not row_idxs:
+                return []
+            head_len = len(self.head)
+            return self.head[row_idxs.start:min(row_idxs.stop, head_len)] + self._read(max(row_idxs.start, head_len)-head_len, row_idxs.stop-head_len)
+
+        row_idx = range(len(self))[idx] #範囲外ならIndexError
+        if row_idx < len(self.head):
+            return self.head[row_idx]
+        row_idx -= len(self.head)
+        return self._read(row_idx, row_idx+1)[0]
+
+    def __iter__(self):
+        for start in range(0, len(self), _COMPACT_CHUNK_ROWS):
+            yield from self[start:start+_COMPACT_CHUNK_ROWS]
+
+    def close(self):
+        """
+        mmapを閉じる(閉じた後はヘッダーより後の行を読めない)
+        """
+        self.mm.close()
+
+    def may_contain(self, text):
+        """
+        変換した行の文字列のフィールドにtextが含まれ得るならTrueを返す(行を変換せずにmmapのバイト列を検索する)
+            フィールドはファイルの文字列の一部なので、ファイルにtextが無ければどのフィールドにも無い
+            dtypesの関数で変換する場合と、textに改行やダブルクォート(読み込みで変わる文字)を含む場合は常にTrueを返す
+        """
+        if not self.raw_text or any(char in text for char in '\r\n"'):
+            return True
+        try:
+            return self.mm.find(text.encode(self.encoding)) != -1
+        except UnicodeEncodeError:
+            return True
+
+    def _read(self, start, stop):
+        """
+        ヘッダーより後の[start:stop]の行を区切り・型変換したリストを返す
+        """
+        if start >= stop:
+            return []
+        end = self.offsets[stop] if stop < len(self.offsets) else len(self.mm)
+        text = self.mm[self.offsets[start]:end].decode(self.encoding)
+        rows = _split_rows(io.StringIO(text, newline=None), sep=self.sep)
+        if self.select is not None:
+            rows = map(self.select, rows)
+        return self.convert(list(rows))
+
+#------------------------------
+# _Accumulatorクラス
+#------------------------------
+class _Accumulator(object):
+    """
+    数値を受け取りながら、件数・最小値・最大値・合計・平均・分散を1パスで集計する
+        各値を分数(分子, 分母)にして、値と2乗の分子を分母毎に整数で足していく(statisticsの_ssと同じ方法)
+        floatの分母は2のべき乗なので分母の種類は少なく、mean, variance, stdevはstatisticsと同じ値(型も同じ)を返す
+        inf, nanはstatisticsと同じく有限の値とは別に足し、その値を結果とする
+    """
+    __slots__ = ('count', 'total', 'min', 'max', 'exact', 'sx_partials', 'sxx_partials', 'special')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0 #sum()と同じ順で足した合計
+        self.min = None
+        self.max = None
+        self.exact = True #intだけを受け取っている(結果をstatisticsと同じくintにできる)
+        self.sx_partials = defaultdict(int) #{分母: 値の分子の合計}
+        self.sxx_partials = defaultdict(int) #{値の分母: 2乗の分子の合計}(2乗の分母は値の分母の2乗)
+        self.special = None #inf, nanの合計
+
+    def add(self, value):
+        """
+        数値(value)を1つ受け取る
+        """
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+        if self.exact and not isinstance(value, int):
+            self.exact = False
+        if self.exact: #intの分母は1
+            self.sx_partials[1] += value
+            self.sxx_partials[1] += value*value
+            return
+        try:
+            n, d = value.as_integer_ratio()
+        except (OverflowError, ValueError): #inf, nan
+            self.special = value if self.special is None else self.special + value
+            return
+        self.sx_partials[d] += n
+        self.sxx_partials[d] += n * n
+
+    def extend(self, values):
+        """
+        数値のリスト(values)をまとめて受け取る
+        """
+        if not values:
+            return
+        if self.exact and not all(isinstance(value, int) for value in values):
+            self.exact = False
+
+        values_min = min(values)
+        values_max = max(values)
+        if self.min is None or values_min < self.min:
+            self.min = values_min
+        if self.max is None or values_max > self.max:
+            self.max = values_max
+        self.total = sum(values, self.total)
+        self.count += len(values)
+
+        if self.exact: #intの分母は1
+            self.sx_partials[1] += sum(values)
+            self.sxx_partials[1] += sum(map(mul, values, values))
+            return
+        sx_partials, sxx_partials = self.sx_partials, self.sxx_partials
+        for value in values:
+            try:
+                n, d = value.as_integer_ratio()
+            except (OverflowError, ValueError): #inf, nan
+                self.special = value if self.special is None else self.special + value
+                continue
+            sx_partials[d] += n
+            sxx_partials[d] += n * n
+
+    def merge(self, other):
+        """
+        別の_Accumulator(other)の集計を統合する(分母毎の合計を足すので正確に統合できる)
+        """
+        if not other.count:
+            return
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+        self.count += other.count
+        self.total += other.total
+        self.exact = self.exact and other.exact
+        for d, n in other.sx_partials.items():
+            self.sx_partials[d] += n
+        for d, n in other.sxx_partials.items():
+            self.sxx_partials[d] += n
+        if other.special is not None:
+            self.special = other.special if self.special is None else self.special + other.special
+
+    def _result(self, fraction):
+        """
+        集計結果の分数(fraction)をstatisticsと同じ型にする
+        """
+        if self.exact:
+            return _fraction2number(fraction)
+        return float(fraction)
+
+    def _mean_fraction(self):
+        return sum(Fraction(n, d) for d, n in self.sx_partials.items()) / self.count
+
+    def _variance_fraction(self):
+        sx = sum(Fraction(n, d) for d, n in self.sx_partials.items())
+        sxx = sum(Fraction(n, d*d) for d, n in self.sxx_partials.items())
+        return (self.count*sxx - sx*sx) / (self.count*(self.count-1))
+
+    def get_min(self):
+        if not self.count:
+            raise ValueError('min() arg is an empty sequence')
+        return self.min
+
+    def get_max(self):
+        if not self.count:
+            raise ValueError('max() arg is an empty sequence')
+        return self.max
+
+    def get_mean(self):
+        if not self.count:
+            raise ValueError('mean requires at least one data point')
+        if self.special is not None:
+            return self.special / self.count
+        return self._result(self._mean_fraction())
+
+    def get_variance(self):
+        if self.count < 2:
+            raise ValueError('variance requires at least two data points')
+        if self.special is not None:
+            return self.special / (self.count-1)
+        return self._result(self._variance_fraction())
+
+    def get_stdev(self):
+        if self.count >= 2 and self.special is None:
+            return _sqrt_of_fraction(self._variance_fraction())
+        return math.sqrt(self.get_variance())
+
+#集計関数と、その結果を_Accumulatorから取り出す関数
+_ACCUMULATOR_FUNCS = {
+    len: lambda acc: acc.count,
+    max: _Accumulator.get_max,
+    min: _Accumulator.get_min,
+    sum: lambda acc: acc.total,
+    mean: _Accumulator.get_mean,
+    variance: _Accumulator.get_variance,
+    stdev: _Accumulator.get_stdev,
+}
+
+#------------------------------
+# _BorderTemplateクラス
+#------------------------------
+class _BorderTemplate(object):
+    """
+    枠パターンの文字列を表の列数に合わせてコンパイルしたテンプレート(_border_templateで作成してキャッシュする)
+        rows: 列数に合わせて列を増減した枠パターンの各行(文字のタプル)
+              偶数の位置は角・交点・縦線の文字、奇数の位置は横線の文字(データの行ではフィールドの値を入れる位置)
+        divisors: 奇数の位置の文字を列の文字列幅分並べる時の割る数(文字幅2の文字は2、それ以外は1)
+        行数は表の行数に合わせて区間(_border_row_segments)で決めるので、どの大きさの表でも各行を並べるだけで枠ができる
+    """
+    __slots__ = ('rows', 'divisors', 'blank_rows')
+
+    def __init__(self, pattern, data_col_num):
+        p_rows = [list(p_row) for p_row in pattern.strip('\n').split('\n')]
+        col_len = max(len(p_row) for p_row in p_rows)
+        p_rows = [p_row + ['']*(col_len - len(p_row)) for p_row in p_rows] #行の長さが違えば空('')で埋める
+        p_col_idxs = list(_border_rows(_border_row_segments(col_len, data_col_num), range(col_len), 0, data_col_num*2+1))
+        self.rows = tuple(tuple(p_row[p_col_idx] for p_col_idx in p_col_idxs) for p_row in p_rows)
+        self.divisors = tuple(tuple(2 if idx % 2 == 1 and _count_em(char) else 1 for idx, char in enumerate(p_row)) for p_row in self.rows)
+        self.blank_rows = tuple(not ''.join(p_row).strip() for p_row in self.rows)
+
+    def row_segments(self, data_row_num):
+        """
+        data_row_num行の表の枠の各行が使う枠パターンの行の区間を返す(_border_row_segments参照)
+        """
+        return _border_row_segments(len(self.rows), data_row_num)
+
+    def border_widths(self, data_row_num):
+        """
+        data_row_num行の表の枠の偶数の位置の文字列幅(表示される枠の行の中の最大文字列幅)のリストを返す
+            wrap_borderの枠を_sprintで表示すると、偶数の位置の列はこの文字列幅に揃えられる
+        """
+        used_row_idxs = sorted(set(row_idx for _, _, row_idxs in self.row_segments(data_row_num) for row_idx in row_idxs))
+        shown_rows = [self.rows[row_idx] for row_idx in used_row_idxs if row_idx % 2 == 1 or not self.blank_rows[row_idx]] #空白のみの枠の行は表示されない
+        return [max([_width(p_row[idx]) for p_row in shown_rows] + [1]) if idx % 2 == 0 else 0 for idx in range(len(self.rows[0]))]
+
+    def iter_rows(self, rows_fields, col_max_widths, data_row_num, start_row=0, grouping=False, border_widths=None):
+        """
+        枠で囲んだ表の各行のフィールドのリストを順に返すジェネレータ(wrap_border, iter_linesの共通処理)
+            rows_fields: (行, その行のmultiple-linesを展開した各行の書式指定済みのフィールドの文字列のリスト)を順に返すイテラブル
+            col_max_widths: 各列の文字列幅
+            data_row_num, start_row: 表全体の行数と、rows_fieldsの最初の行の表全体での行インデックス(表の行の窓を囲む場合)
+            grouping: Trueならば隣接するフィールド値が同じならば、その境界の枠をスペースにする(窓の端の枠はグループ化しない)
+            border_widths: 指定すると偶数の位置の文字をその文字列幅まで空白で埋める(iter_linesで1行の文字列にする場合)
+            空白のみの行は返さない
+        """
+        def pad(idx, char):
+            return char if border_widths is None else char + ' '*(border_widths[idx] - _width(char))
+
+        #枠パターンの各行を各列の文字列幅に合わせた文字列のリストにする(各列の文字幅に合うように枠の数を調整)
+        cells_rows = [[char * (col_max_widths[idx//2]//divisor) if idx % 2 == 1 else pad(idx, char)
+                       for idx, (char, divisor) in enumerate(zip(p_row, divisors))] for p_row, divisors in zip(self.rows, self.divisors)]
+        blank_fills = [' '*width for width in col_max_widths]
+        blank_borders = [pad(idx, ' ') for idx in range(len(self.rows[0]))]
+        def is_blank(cells):
+            return not ''.join(cells).strip()
+        blank_rows = [is_blank(cells) for cells in cells_rows] #枠の行が空白のみか
+        blank_border_rows = [is_blank(cells[0::2]) for cells in cells_rows] #データの行の偶数の位置(縦線)が空白のみか
+
+        p_row_idxs = _border_rows(self.row_segments(data_row_num), range(len(self.rows)), start_row*2, data_row_num*2+1)
+        upper_row = None
+        for row, fields_lines in rows_fields:
+            p_row_idx = next(p_row_idxs)
+            cells = cells_rows[p_row_idx][:]
+            blank = blank_rows[p_row_idx]
+            if grouping and upper_row is not None and not blank:
+                grouped = False
+                for col_idx, (field, upper_field) in enumerate(zip(row, upper_row)):
+                    if field == upper_field:
+                        cells[col_idx*2+1] = blank_fills[col_idx]
+                        grouped = True
+                if grouped:
+                    blank = is_blank(cells)
+            if not blank:
+                yield cells
+
+            p_row_idx = next(p_row_idxs)
+            data_cells = cells_rows[p_row_idx]
+            blank = blank_border_rows[p_row_idx]
+            if grouping and not blank:
+                same_col_idxs = [col_idx for col_idx in range(1, len(row)) if row[col_idx-1] == row[col_idx]]
+                if same_col_idxs:
+                    data_cells = data_cells[:]
+                    for col_idx in same_col_idxs:
+                        data_cells[col_idx*2] = blank_borders[col_idx*2]
+                    blank = is_blank(data_cells[0::2])
+            for fields in fields_lines:
+                if blank and is_blank(fields):
+                    continue
+                cells = data_cells[:]
+                cells[1::2] = fields
+                yield cells
+            upper_row = row
+
+        p_row_idx = next(p_row_idxs)
+        if not blank_rows[p_row_idx]:
+            yield cells_rows[p_row_idx][:]
+
 #------------------------------
 # TwoDimArrayクラス
 #------------------------------
@@ -464,8 +1068,9 @@ class TwoDimArray(object):
     _DEFAULT_PRECISION = 2
     _DEFAULT_DISPLAY_DELIMITER = ', '
     _DEFAULT_HEAD = 5
-    _DEFAULT_PRINT_FILE = {'file':None, 'encoding':None}
+    _DEFAULT_PRINT_FILE = {'file':None, 'encoding':None, 'compression':'infer'}
     _DEFAULT_PRINT_CONTEXTMANAGER = None
+    _DEFAULT_COLUMN_MAJOR = False
 
     def __init__(self, tda_data=None):
         """
@@ -477,6 +1082,9 @@ class TwoDimArray(object):
         #tda_dataがリストの2次元配列かチェック
         if (isinstance(tda_data, list) and bool(tda_data) #tda_dataはリストで何か入っている
             and isinstance(tda_data[0], list) and bool(tda_data[0])): #入ってるのはリストで、さらに何か(データ)入っていればOK
+            self._columns = None #列指向で保持したデータ(column_major参照)
+            self._index_col_idxs = None #インデックス化する列(create_index参照)
+            self._string_index_enabled = False #文字列の部分一致検索用のインデックスを使うか(create_string_index参照)
             self.data = tda_data
         else:
             raise ValueError(f"TwoDimArray()の引数tda_dataはリストの2次元配列を期待しています(tda_dataの最小構成は[['']]): {repr(tda_data)}")
@@ -503,6 +1111,7 @@ class TwoDimArray(object):
         self._head = TwoDimArray._DEFAULT_HEAD #print関数で表示するself.dataの先頭からの行数
         self.print_file = TwoDimArray._DEFAULT_PRINT_FILE.copy() #設定したファイルにprint関連メソッドの出力が上書き保存される
         self.print_contextmanager = TwoDimArray._DEFAULT_PRINT_CONTEXTMANAGER #print関連メソッドの前後処理を行うcontextmanagerを登録できる(contextmanagerにはselfが渡される)
+        self.column_major = TwoDimArray._DEFAULT_COLUMN_MAJOR #Trueにするとcolumn操作時にデータを列指向で保持し、行と列の入れ替えを繰り返さない
 
     def _copy_property(self, src):
         """
@@ -525,6 +1134,172 @@ class TwoDimArray(object):
         self._head = src._head
         self.print_file = src.print_file.copy()
         self.print_contextmanager = src.print_contextmanager
+        self.column_major = src.column_major
+
+    #------------------------------
+    # データ
+    #------------------------------
+    #   データは行指向(行のリスト: self._data)か列指向(列のリスト: self._columns)のどちらかで保持する
+    #
+    #   ・column_major=False(デフォルト): 常に行指向で保持する
+    #     column操作は行と列を入れ替えた列のリストで処理して、行指向に戻す
+    #   ・column_major=True: column操作時に列指向で保持し直し、以降のcolumn操作は列のリストを直接操作する
+    #     self.dataにアクセスすると行指向に戻る(次のcolumn操作で再び列指向になる)
+    #     ※列指向にするとき、TwoDimArrayの欠けている箇所は空('')で埋められる
+    #
+    #   ・load(lazy=True): 行指向のデータ(self._data)はファイルの行を必要な時に変換する_LazyRowsになる
+    #     行の範囲の読み出し(_get_rows, _get_rowなど)と表示は必要な行だけを変換する
+    #     その他の操作では全ての行を変換して通常のリストで保持し直す(_load_lazy_rows参照)
+    #------------------------------
+    @property
+    def data(self):
+        """
+        TwoDimArrayのデータ(リストの2次元配列)
+            列指向で保持している場合は行指向に戻してから返す
+        """
+        if self._columns is not None:
+            self._data = row2column(self._columns)
+            self._columns = None
+        self._load_lazy_rows()
+        self._data_changed() #返したリストが変更されるかもしれないので、次の検索時にインデックスを作り直す
+        return self._data
+
+    @data.setter
+    def data(self, tda_data):
+        self._data = tda_data
+        self._columns = None
+        self._data_changed()
+
+    def _is_lazy(self):
+        """
+        行をファイルから遅延読み込みしている(load(lazy=True))ならTrueを返す
+        """
+        return self._columns is None and isinstance(self._data, _LazyRows)
+
+    def _load_lazy_rows(self):
+        """
+        遅延読み込みしている行を全て変換して通常のリストで保持し直す
+        """
+        if self._is_lazy():
+            lazy_rows = self._data
+            self._data = list(lazy_rows)
+            lazy_rows.close() #全ての行を変換したのでファイルは不要
+
+    def close(self):
+        """
+        遅延読み込み(load(lazy=True))で開いているファイルを閉じる
+            閉じた後は変換済みでない行を読み込めない(全ての行を変換済みのTwoDimArrayや、遅延読み込みでない場合は何もしない)
+            with文で使うと、ブロックを抜ける時に閉じる
+        """
+        if self._is_lazy():
+            self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _data_changed(self):
+        """
+        データが変更された時の処理
+            インデックス(create_index, create_string_index参照)を破棄して、次の検索時に作り直す
+        """
+        self._indexes = None
+        self._string_index = None
+
+    def _fields_changed(self, changes, new_value):
+        """
+        フィールドが変更された時の処理(replace_fieldの処理)
+            作成済みのインデックスを変更されたフィールドの分だけ更新する
+            changes: 変更されたフィールドのリスト[(行インデックス, 列インデックス, 変更前の値), ...]
+            new_value: 変更後の値
+        """
+        if self._indexes is not None:
+            col_len, indexes = self._indexes
+            for row_idx, col_idx, old_value in changes:
+                if col_idx not in indexes:
+                    continue
+                index, unhashables = indexes[col_idx]
+                if _is_hashable(old_value):
+                    row_idxs = index[old_value]
+                    del row_idxs[bisect_left(row_idxs, row_idx)]
+                    if not row_idxs:
+                        del index[old_value]
+                else:
+                    unhashables.remove(row_idx)
+
+                if _is_hashable(new_value):
+                    insort(index[new_value], row_idx)
+                else:
+                    unhashables.append(row_idx)
+
+        if self._string_index is not None:
+            width, grams, shorts = self._string_index
+            for row_idx, col_idx, old_value in changes:
+                cell_id = row_idx*width + col_idx
+                _discard_grams(grams, shorts, cell_id, old_value)
+                _add_grams(grams, shorts, cell_id, new_value)
+
+    def _get_columns(self):
+        """
+        列のリストを返す(column操作の共通処理)
+            列指向で保持していればそのまま返す(変更すればTwoDimArrayのデータが変わる)
+            行指向で保持していれば行と列を入れ替えた列のリストを返す(column_majorがTrueならば以降は列指向で保持する)
+        """
+        if self._columns is None:
+            self._load_lazy_rows()
+            columns = row2column(self._data)
+            if not self.column_major:
+                return columns
+
+            self._columns = columns
+            self._data = None
+
+        return self._columns
+
+    def _set_columns(self, columns):
+        """
+        列のリスト(columns)をTwoDimArrayのデータにする(column操作の共通処理)
+            column_majorがTrueならば列指向のまま保持する
+        """
+        if self.column_major:
+            col_len = max(map(len, columns), default=0)
+            self._columns = [col if len(col) == col_len else list(col) + ['']*(col_len - len(col)) for col in columns] #欠けている箇所は空('')で埋める
+            self._data = None
+            self._data_changed()
+        else:
+            self.data = row2column(columns)
+
+    def _get_rows(self, row_start_idx=None, row_end_idx=None):
+        """
+        行範囲[row_start_idx:row_end_idx]の行のリストを返す
+            列指向で保持していても行指向に戻さない(範囲内の行だけを作成する)
+        """
+        if self._columns is None:
+            return self._data[row_start_idx:row_end_idx]
+
+        return [list(row) for row in zip(*[col[row_start_idx:row_end_idx] for col in self._columns])]
+
+    def _get_row(self, row_idx):
+        """
+        指定行(row_idx)を返す
+            列指向で保持していても行指向に戻さない
+        """
+        if self._columns is None:
+            return self._data[row_idx]
+
+        return [col[row_idx] for col in self._columns]
+
+    def _columns2tda(self, columns):
+        """
+        列のリスト(columns)からselfのプロパティをコピーしたTwoDimArrayインスタンスを作成する
+        """
+        new_tda = TwoDimArray()
+        new_tda._copy_property(self)
+        if columns and len(columns[0]):
+            new_tda._set_columns(columns)
+        return new_tda
 
     def __call__(self, *args):
         """
@@ -542,10 +1317,14 @@ class TwoDimArray(object):
             return self.get_header_idx(header_value)
 
     def _row_len(self):
-        return len(self.data)
+        if self._columns is not None:
+            return len(self._columns[0]) if self._columns else 0
+        return len(self._data)
 
     def _col_len(self):
-        return len(self.data[0])
+        if self._columns is not None:
+            return len(self._columns)
+        return len(self._data[0])
 
     def _row_center(self):
         return self._row_len()//2
@@ -596,26 +1375,62 @@ class TwoDimArray(object):
     def __str__(self):
         return self._sprint(head=self._head)
 
-    def _sprint(self, head=None, tail=None, header_aligns=None, aligns=None, widths=None, _chk_multiple_lines=True):
+    def _sprint(self, head=None, tail=None, header_aligns=None, aligns=None, widths=None, _chk_multiple_lines=True, _remain_rows=(0, 0)):
         """
         self.dataの行列文字列を返す
             head: 先頭からの行数を指定
             tail: 最後尾からの行数を指定
+            表示される行の窓(_head_tail_window参照)だけを文字列にするので、表の大きさに関係なく表示できる
 
             _chk_multiple_lines: multiple-lines処理をするか否かのスイッチ
                                  print2, print_idx2メソッドなどの枠付きでは枠の処理でmultiple-lines処理をするため不要となる
+            _remain_rows: 表示範囲外の行数に加える(上の行数, 下の行数) (_head_tail_window参照)
         """
+        window_tda, top_rows, bottom_rows = self._head_tail_window(head, tail)
+        if _chk_multiple_lines:
+            top_rows, bottom_rows = self._outside_lines(top_rows, bottom_rows) #窓の外の行もmultiple-linesを展開した行数で数える
+
         if tail is not None:
             head = None #tail優先
             tail = -tail #-tailで最後尾からのインデックスに変換
 
-        return self._sprint_range(row_start_idx=tail, row_end_idx=head, 
-                                  header_aligns=header_aligns, aligns=aligns, widths=widths, _chk_multiple_lines=_chk_multiple_lines)
+        return window_tda._sprint_lines(row_start_idx=tail, row_end_idx=head, header_aligns=header_aligns, aligns=aligns, widths=widths,
+                                        _chk_multiple_lines=_chk_multiple_lines,
+                                        _remain_rows=(_remain_rows[0]+top_rows, _remain_rows[1]+bottom_rows))
 
     def _sprint_range(self, row_start_idx=0, row_end_idx=None, header_aligns=None, aligns=None, widths=None, _chk_multiple_lines=True):
         """
-        指定された行範囲の文字列を返す
-            ※TwoDimArray文字列化の共通関数
+        指定された行範囲[row_start_idx:row_end_idx]の文字列を返す
+            行範囲はmultiple-linesを展開した行のインデックスで指定する
+            各行の展開後の行数は展開せずに数え(_lines_per_row参照)、範囲に掛かる行だけを切り出して展開する
+        """
+        if _chk_multiple_lines:
+            line_nums = list(self._lines_per_row())
+        else:
+            line_nums = [1]*self._row_len()
+        all_line_idxs = range(sum(line_nums))
+        line_idxs = all_line_idxs[row_start_idx:row_end_idx]
+        if not line_idxs: #表示する行が無い(範囲外の行数だけを表示する)
+            top_lines = len(all_line_idxs[:row_start_idx]) if row_start_idx is not None else 0
+            bottom_lines = len(all_line_idxs[row_end_idx:]) if row_end_idx is not None else 0
+            return self._tda_string_format(row_start_idx=0, row_end_idx=0, _remain_rows=(top_lines, bottom_lines-self._row_len())) #[0:0]の下の行数を除く
+
+        #範囲の最初と最後の行を含む行(展開前の行)を求める
+        line_starts = list(accumulate(line_nums, initial=0)) #各行の展開後の開始位置
+        window_idxs = range(bisect_right(line_starts, line_idxs.start)-1, bisect_left(line_starts, line_idxs.stop))
+        if len(window_idxs) == len(line_nums) and not self._is_lazy():
+            window_tda = self
+        else:
+            window_tda = self._window_tda(window_idxs)
+        window_start = line_starts[window_idxs.start]
+        return window_tda._sprint_lines(row_start_idx=line_idxs.start-window_start, row_end_idx=line_idxs.stop-window_start,
+                                        header_aligns=header_aligns, aligns=aligns, widths=widths, _chk_multiple_lines=_chk_multiple_lines,
+                                        _remain_rows=(window_start, line_starts[-1]-line_starts[window_idxs.stop]))
+
+    def _sprint_lines(self, row_start_idx=0, row_end_idx=None, header_aligns=None, aligns=None, widths=None, _chk_multiple_lines=True, _remain_rows=(0, 0)):
+        """
+        multiple-linesを展開した行範囲[row_start_idx:row_end_idx]の文字列を返す
+            ※TwoDimArray文字列化の共通関数(_sprint, _sprint_rangeで表示する行の窓に対して呼び出す)
         """
         if self.multiple_lines and _chk_multiple_lines:
             m_tda, _ = self._extend_multiple_lines()
@@ -623,7 +1438,158 @@ class TwoDimArray(object):
         else:
             tda = self
 
-        return tda._tda_string_format(row_start_idx=row_start_idx, row_end_idx=row_end_idx, header_aligns=header_aligns, aligns=aligns, widths=widths)
+        return tda._tda_string_format(row_start_idx=row_start_idx, row_end_idx=row_end_idx, header_aligns=header_aligns, aligns=aligns, widths=widths,
+                                      _remain_rows=_remain_rows)
+
+    def _head_tail_window(self, head=None, tail=None, relative_header=False):
+        """
+        head, tail(_sprintと同じ指定)で表示される行だけを切り出したTwoDimArrayインスタンスと、
+        切り出さなかった(上の行数, 下の行数)を返す
+            表示はhead, tailで窓のTwoDimArrayから切り出すので、切り出さなかった行数は表示範囲外の行数に加える
+            (head, tailの行数は表示する行数なので、multiple-linesや枠で行が増えても窓の行で足りる)
+            全ての行が窓に入る場合はself(load(lazy=True)以外)をそのまま返す
+            ・表示範囲外の行数(↑(There are N rows)など)は、窓の外の行を展開せずに展開後の行数で数える(_outside_lines参照)
+              (枠付きの表示では枠パターンから枠の行数を求める(_wrap_window参照))
+            ・print2, print_idx2の列幅は窓の行だけで決める
+            relative_header: Trueならばheader_idxを窓の中のインデックスにする(wrap_borderで枠を作る場合)
+        """
+        row_idxs = range(self._row_len())
+        if tail is not None:
+            window_idxs = row_idxs[-tail:]
+        else:
+            window_idxs = row_idxs[:head]
+        if not window_idxs: #表示する行が無くても窓のTwoDimArrayは1行必要
+            window_idxs = row_idxs[:1]
+        if not window_idxs: #空のTwoDimArray
+            return self, 0, 0
+
+        top_rows, bottom_rows = window_idxs.start, len(row_idxs)-window_idxs.stop
+        if not (top_rows or bottom_rows or self._is_lazy()):
+            return self, 0, 0
+        return self._window_tda(window_idxs, relative_header), top_rows, bottom_rows
+
+    def _window_tda(self, window_idxs, relative_header=False):
+        """
+        行インデックスの範囲(window_idxs)の行だけを切り出したTwoDimArrayインスタンスを返す
+            load(lazy=True)ならば範囲の行だけをファイルから読み込む
+        """
+        window_tda = TwoDimArray(self._get_rows(window_idxs.start, window_idxs.stop) if window_idxs else None)
+        window_tda._copy_property(self)
+        if relative_header and self.header_idx is not None:
+            header_idx = range(self._row_len())[self.header_idx] if -self._row_len() <= self.header_idx < self._row_len() else None
+            window_tda.header_idx = header_idx - window_idxs.start if header_idx in window_idxs else None
+        return window_tda
+
+    def _lines_per_row(self, row_start_idx=None, row_end_idx=None, skip_blank_lines=False, index_column=False):
+        """
+        行範囲[row_start_idx:row_end_idx]の各行をmultiple-linesで展開した時の行数を順に返すイテレータ
+            展開はせず、文字列のフィールドのmultiple_lines_delimiterの数の最大値+1を行数とする(_extend_multiple_linesと同じ行数)
+            multiple_linesがFalse、もしくはload(lazy=True)のファイルにmultiple_lines_delimiterが無ければ、行を読まずに全て1行とする
+            skip_blank_lines: Trueならば全てのフィールドが空白の行を数えない(縦線が空白の枠ではwrap_borderが表示しない行)
+            index_column: Trueならば各行の最初の行は空白でないとする(print_idx2で行のインデックスの列を付け加える場合)
+        """
+        row_idxs = range(self._row_len())[row_start_idx:row_end_idx]
+        delimiter = self.multiple_lines_delimiter if self.multiple_lines else None
+        if not row_idxs:
+            return iter(())
+        if not skip_blank_lines and (delimiter is None or (self._is_lazy() and not self._data.may_contain(delimiter))):
+            return repeat(1, len(row_idxs))
+
+        def is_shown(line_idx, line):
+            return (index_column and line_idx == 0) or any(not isinstance(field, str) or field.strip() for field in line)
+
+        def line_nums():
+            for start in range(row_idxs.start, row_idxs.stop, _SAVE_CHUNK_ROWS):
+                rows = self._get_rows(start, min(start+_SAVE_CHUNK_ROWS, row_idxs.stop))
+                if not skip_blank_lines and delimiter not in '\0'.join([field for field in chain.from_iterable(rows) if isinstance(field, str)]):
+                    yield from repeat(1, len(rows)) #まとめて調べてmultiple-linesが無ければ全て1行
+                    continue
+                for row in rows:
+                    if not skip_blank_lines:
+                        yield max([field.count(delimiter) for field in row if isinstance(field, str)], default=0) + 1
+                        continue
+                    fields_lines = [field.split(delimiter) if delimiter is not None and isinstance(field, str) else [field] for field in row]
+                    yield sum(is_shown(line_idx, line) for line_idx, line in enumerate(zip_longest(*fields_lines, fillvalue='')) or [(0, ())])
+        return line_nums()
+
+    def _outside_lines(self, top_rows, bottom_rows):
+        """
+        先頭のtop_rows行と最後のbottom_rows行(表示する窓の外の行)をmultiple-linesで展開した時の(上の行数, 下の行数)を返す
+        """
+        row_len = self._row_len()
+        return (sum(self._lines_per_row(0, top_rows)) if top_rows else 0,
+                sum(self._lines_per_row(row_len-bottom_rows, row_len)) if bottom_rows else 0)
+
+    def _wrap_window(self, border_pattern, top_rows, bottom_rows, aligns=None, src_tda=None, index_column=False):
+        """
+        窓のTwoDimArray(self)を枠で囲んだTwoDimArrayインスタンスと、表示範囲外の(上の行数, 下の行数)を返す(print2, print_idx2の共通処理)
+            top_rows, bottom_rows: 窓の上と下の切り出さなかった行数(_head_tail_window参照)
+            src_tda, index_column: 窓を切り出した元のTwoDimArrayと、窓に行のインデックスの列を付け加えたか(print_idx2)
+                                   切り出さなかった行をmultiple-linesで展開した行数を元のTwoDimArrayで数える(_outside_lines参照)
+            枠は表全体を囲んだ場合と同じ枠の行を窓の部分だけ作る(wrap_borderの_window_rows参照)
+            表示範囲外の行数は枠の行とmultiple-linesで増える行を含めて数える
+            切り出さなかった行の枠のグループ化は調べないので、グループ化で空白になる枠の行も数える
+        """
+        wrap_tda = self.wrap_border(border_pattern, aligns=aligns, _window_rows=(top_rows, bottom_rows))
+        if not (top_rows or bottom_rows):
+            return wrap_tda, 0, 0
+
+        template = _border_template(border_patterns[border_pattern], len(self._get_columns()))
+        data_row_num = top_rows + self._row_len() + bottom_rows
+        segments = template.row_segments(data_row_num)
+        counted = [row_idx % 2 == 1 or not blank for row_idx, blank in enumerate(template.blank_rows)] #データの行と空白でない枠の行を数える
+        top_lines = _count_border_rows(segments, 0, top_rows*2, counted)
+        bottom_lines = _count_border_rows(segments, (data_row_num-bottom_rows)*2+1, data_row_num*2+1, counted)
+        if src_tda is not None: #multiple-linesの行は展開した行数だけデータの行が増える(上の数え方ではデータの行は1行)
+            src_row_len = src_tda._row_len()
+            row_offset = 1 if index_column else 0 #print_idx2の表では先頭にインデックスの行がある(_add_idx参照)
+            top_lines += src_tda._bordered_lines(template, segments, 0, top_rows, row_offset, index_column) - top_rows
+            bottom_lines += src_tda._bordered_lines(template, segments, src_row_len-bottom_rows, src_row_len, row_offset, index_column) - bottom_rows
+        return wrap_tda, top_lines, bottom_lines
+
+    def _wrap_head_tail(self, border_pattern, head=None, tail=None, index_column=False):
+        """
+        head, tail(_sprintと同じ指定)で表示される行の窓を枠で囲んだTwoDimArrayインスタンスと、表示範囲外の(上の行数, 下の行数)を返す
+        (print2, print_idx2の共通処理)
+            index_column: Trueならば窓に行と列のインデックスを付け加えてから枠で囲む(print_idx2)
+            縦線が空白の枠ではフィールドが全て空白の行は表示されないので、窓の行が表示する行数に足りなければ窓を広げる
+        """
+        need_lines = tail if tail is not None else head
+        window_head, window_tail = head, tail
+        while True:
+            window_tda, top_rows, bottom_rows = self._head_tail_window(window_head, window_tail, relative_header=True)
+            if index_column:
+                window_tda = window_tda._add_idx(top_rows)
+            wrap_tda, top_lines, bottom_lines = window_tda._wrap_window(border_pattern, top_rows, bottom_rows, aligns={0:'>'} if index_column else None, #文字列のインデックスを右寄りに配置
+                                                                        src_tda=self, index_column=index_column)
+            shown_lines = 0 if wrap_tda._get_rows() == [['']] else wrap_tda._row_len() #表示する行が無い枠は[['']]
+            if not need_lines or shown_lines >= need_lines or not (top_rows if tail is not None else bottom_rows):
+                return wrap_tda, top_lines, bottom_lines
+            if tail is not None:
+                window_tail *= 2
+            else:
+                window_head *= 2
+
+    def _bordered_lines(self, template, segments, row_start_idx, row_end_idx, row_offset=0, index_column=False):
+        """
+        行範囲[row_start_idx:row_end_idx]の各行を枠(template)で囲んで表示した時のデータの行数の合計を返す(_wrap_windowの処理)
+            segments: 表全体の枠の行の区間(template.row_segments)
+            row_offset: 枠で囲む表での行インデックスとselfの行インデックスの差(print_idx2ではインデックスの行が加わる)
+            データの行の縦線が空白の枠の行では、フィールドが全て空白の行は表示されないので数えない(_BorderTemplate.iter_rows参照)
+            区間の繰り返しの部分(枠パターンの行の組)では同じ枠の行が続くので、まとめて数える
+        """
+        blank_borders = [not ''.join(p_row[0::2]).strip() for p_row in template.rows] #データの行の縦線が空白のみか
+        count = 0
+        for seg_start, seg_stop, row_idxs in segments:
+            #区間内にデータの行(位置row_idx*2+1)がある行
+            lo, hi = max(row_start_idx+row_offset, seg_start//2), min(row_end_idx+row_offset, seg_stop//2)
+            if lo >= hi:
+                continue
+            runs = [(lo, hi)] if len(row_idxs) <= 2 else [(idx, idx+1) for idx in range(lo, hi)]
+            for start, stop in runs:
+                p_row_idx = row_idxs[(start*2+1 - seg_start) % len(row_idxs)]
+                count += sum(self._lines_per_row(start-row_offset, stop-row_offset, blank_borders[p_row_idx], index_column))
+        return count
 
     @add_print_contextmanager
     def print(self, head=None, tail=None):
@@ -638,30 +1604,30 @@ class TwoDimArray(object):
         """
         self.dataの行列を枠で囲んで見やすくして表示する
         """
-        wrap_tda = self.wrap_border(self.print2_border)
+        wrap_tda, top_lines, bottom_lines = self._wrap_head_tail(self.print2_border, head, tail) #表示する行だけを枠で囲む
         with self._print_strings() as strings:
             #multiple-linesの処理はwrap_borderメソッドで処理済み
-            strings.append(wrap_tda._sprint(head=head, tail=tail, _chk_multiple_lines=False))
+            strings.append(wrap_tda._sprint(head=head, tail=tail, _chk_multiple_lines=False, _remain_rows=(top_lines, bottom_lines)))
 
     @add_print_contextmanager
     def print_idx(self, head=None, tail=None):
         """
         self.dataに行と列のインデックス情報を付け加えて行列表示する
         """
-        idx_tda = self._add_idx()
+        window_tda, top_rows, bottom_rows = self._head_tail_window(head, tail) #表示する行だけにインデックスを付け加える
+        idx_tda = window_tda._add_idx(top_rows)
         with self._print_strings() as strings:
-            strings.append(idx_tda._sprint(head=head, tail=tail, aligns={0:'>'})) #文字列のインデックスを右寄りに配置
+            strings.append(idx_tda._sprint(head=head, tail=tail, aligns={0:'>'}, _remain_rows=self._outside_lines(top_rows, bottom_rows))) #文字列のインデックスを右寄りに配置
 
     @add_print_contextmanager
     def print_idx2(self, head=None, tail=None):
         """
         self.dataに行と列のインデックス情報を付け加え、さらに枠で囲んで見やすくした行列を表示する
         """
-        idx_tda = self._add_idx()
-        wrap_tda = idx_tda.wrap_border(idx_tda.print_idx2_border, aligns={0:'>'}) #文字列のインデックスを右寄りに配置
+        wrap_tda, top_lines, bottom_lines = self._wrap_head_tail(self.print_idx2_border, head, tail, index_column=True) #表示する行だけにインデックスを付け加えて枠で囲む
         with self._print_strings() as strings:
             #multiple-linesの処理はwrap_borderメソッドで処理済み
-            strings.append(wrap_tda._sprint(head=head, tail=tail, _chk_multiple_lines=False))
+            strings.append(wrap_tda._sprint(head=head, tail=tail, _chk_multiple_lines=False, _remain_rows=(top_lines, bottom_lines)))
 
     @add_print_contextmanager
     def print_chg_format(self, head=None, tail=None, header_aligns=None, aligns=None, widths=None):
@@ -681,14 +1647,87 @@ class TwoDimArray(object):
         with self._print_strings() as strings:
             strings.append(self._sprint_range(row_start_idx=row_start_idx, row_end_idx=row_end_idx))
 
-    def _add_idx(self):
+    def iter_lines(self, border_pattern=None, header_aligns=None, aligns=None, widths=None):
+        """
+        self.dataの行列を表示する文字列を1行ずつ返すジェネレータ
+            border_pattern: 枠パターン(border_patternsの中から選択)を指定するとprint2と同じく枠で囲む(未指定ならばprintと同じ表示)
+            header_aligns, aligns, widths: print_chg_formatと同じ書式指定
+
+            1回目の走査で各列の最大文字列幅だけを求め、2回目の走査で各行を文字列にして返す
+            表全体の文字列や枠のTwoDimArrayは作らないので、表の大きさに関係なく少しずつページャやファイルに書き出せる
+            (列指向やload(lazy=True)で保持していても、全ての行のリストは作らない)
+
+                with open('table.txt', 'w', encoding='utf-8') as f:
+                    f.writelines(line + '\n' for line in tda.iter_lines('Grid'))
+        """
+        if border_pattern is not None and border_pattern not in border_patterns:
+            raise ValueError(f'border_patternは{list(border_patterns)}の中から指定してください: {repr(border_pattern)}')
+
+        if not self._row_len(): #空のTwoDimArrayは表示の文字列をそのまま分ける
+            if border_pattern is None:
+                tda_str = self._sprint(header_aligns=header_aligns, aligns=aligns, widths=widths)
+            else:
+                tda_str = self.wrap_border(border_pattern, header_aligns=header_aligns, aligns=aligns, widths=widths)._sprint(_chk_multiple_lines=False)
+            yield from tda_str.split('\n')
+            return
+
+        delimiter = self.multiple_lines_delimiter if self.multiple_lines else None
+        grouping_opt, precision = self.grouping_opt, self.precision
+        col_num = 0
+        if border_pattern is not None: #枠で囲む場合はデータの穴を埋める(wrap_borderと同じ)
+            col_num = max(len(row) for rows in self._iter_row_chunks() for row in rows)
+
+        def rows_lines(rows): #各行と、その行のmultiple-linesを展開した行のリスト
+            for row in rows:
+                if len(row) < col_num:
+                    row = list(row) + ['']*(col_num - len(row))
+                yield row, ((row,) if delimiter is None else _multiple_lines_rows(row, delimiter))
+
+        #各列のalignとwidth(_fields_string_formatと同じ)
+        #枠で囲む場合は文字幅2のフィールド値や枠にも対応できるようにwidthを偶数にする
+        width_column_chunks = (_str_width_columns([line for _, lines in rows_lines(rows) for line in lines], grouping_opt, precision)[2]
+                               for rows in self._iter_row_chunks())
+        col_aligns, h_aligns, col_max_widths = _column_layout(width_column_chunks, header_aligns, aligns, widths,
+                                                              even_widths=border_pattern is not None, col_num=col_num)
+        formatters = [_cell_formatter(align, width, grouping_opt, precision) for align, width in zip(col_aligns, col_max_widths)]
+        header_formatters = [_cell_formatter(align, width, grouping_opt, precision) for align, width in zip(h_aligns, col_max_widths)]
+
+        def format_lines(): #(行, その行のmultiple-linesを展開した各行のフィールドの文字列のリスト)
+            header_idx = self.header_idx
+            line_idx = 0
+            for rows in self._iter_row_chunks():
+                for row, lines in rows_lines(rows):
+                    fields_lines = []
+                    for line in lines:
+                        fmts = header_formatters if line_idx == header_idx else formatters
+                        fields_lines.append([fmt(field, field_str, _width(field_str)) for fmt, field, field_str
+                                             in zip(fmts, line, _field2str([line], grouping_opt, precision)[0])])
+                        line_idx += 1
+                    yield row, fields_lines
+
+        if border_pattern is None:
+            display_delimiter = self._display_delimiter
+            for row, fields_lines in format_lines():
+                for fields in fields_lines:
+                    yield display_delimiter.join(fields)
+            return
+
+        #コンパイルした枠パターン(_border_template)の各行にフィールドの文字列を入れて並べる
+        #枠の偶数の位置の文字列幅は、wrap_borderの枠を_sprintで表示した場合と同じにする
+        template = _border_template(border_patterns[border_pattern], col_num)
+        border_widths = template.border_widths(self._row_len())
+        for cells in template.iter_rows(format_lines(), col_max_widths, self._row_len(), grouping=self.border_grouping, border_widths=border_widths):
+            yield ''.join(cells)
+
+    def _add_idx(self, row_offset=0):
         """
         行と列のインデックス表示のために、インデックス情報を加えたTwoDimArrayインスタンスを返す
         (print_idxとprint_idx2の共通処理)
+            row_offset: 行のインデックスの開始値(表示する行の窓だけにインデックスを付け加える場合)
         """
-        columns = row2column(self.data)
-        columns.insert(0, [str(i) for i in range(len(columns[0]))]) #左端の列に文字列のインデックス追加
-        columns.append([str(i) for i in range(len(columns[0]))]) #右端の列に文字列のインデックス追加
+        columns = list(self._get_columns())
+        columns.insert(0, [str(i) for i in range(row_offset, row_offset+len(columns[0]))]) #左端の列に文字列のインデックス追加
+        columns.append([str(i) for i in range(row_offset, row_offset+len(columns[0]))]) #右端の列に文字列のインデックス追加
         rows = row2column(columns)
 
         max_col_num = max([len(row) for row in rows])
@@ -715,7 +1754,7 @@ class TwoDimArray(object):
             return (None, None)
         #print(f'multiple_lines_idxs: {multiple_lines_idxs}') ###
 
-        tda_data = copy.deepcopy(self.data)
+        tda_data = [list(row) for row in self._get_rows()]
         def field2multiple_lines(row_idx, col_idx): #一行表現のmultiple-linesを複数行表現(リスト)に変換
             tda_data[row_idx][col_idx] = [_str2int_or_float(field) for field in tda_data[row_idx][col_idx].split(self.multiple_lines_delimiter)]
         [field2multiple_lines(row_idx, col_idx) for row_idx, col_idx in multiple_lines_idxs]
@@ -784,19 +1823,44 @@ class TwoDimArray(object):
         self.fill() #TwoDimArrayに欠損があれば埋める
         return (self._row_len(), self._col_len())
 
+    @property
+    def dtypes(self):
+        """
+        各列の型(int, float, str)のリストを返す
+            データ範囲(data_row_range)の各列から標本を取り出して推定する(空('')のフィールドは無視する)
+            intとfloatが混在する列はfloat、数字が少数しか無い列はstrとなる
+        """
+        row_idxs = range(self._row_len())[self.data_row_range]
+        step = max(1, len(row_idxs) // _DTYPE_SAMPLE_SIZE)
+        if self._columns is not None:
+            return [_infer_dtype([col[row_idx] for row_idx in row_idxs[::step]]) for col in self._columns]
+
+        self._load_lazy_rows()
+        data = self._data
+        sample_rows = [data[row_idx] for row_idx in row_idxs[::step]]
+        col_len = max(map(len, data)) if data else 0
+        return [_infer_dtype([row[col_idx] for row in sample_rows if col_idx < len(row)]) for col_idx in range(col_len)]
+
     def counter_row(self, row_idx):
         """
         指定行(row_idx)のCounterを返す
         """
-        return Counter(self.data[row_idx])
+        return Counter(self._get_row(row_idx))
 
     def counter_column(self, col_idx):
         """
         指定列(col_idx)のCounterを返す
         """
-        return Counter([self.data[row_idx][col_idx] for row_idx in range(len(self.data))])
+        if self._columns is not None:
+            column = self._columns[col_idx]
+            if isinstance(column, _CategoryColumn): #コードで数える
+                categories = column.categories
+                return Counter({categories[code]: count for code, count in Counter(column.codes).items()})
+            return Counter(column)
+
+        return Counter([row[col_idx] for row in self.data])
 
-    def _fields_string_format(self, row_start_idx=0, row_end_idx=None, header_aligns=None, aligns=None, widths=None):
+    def _fields_string_format(self, row_start_idx=0, row_end_idx=None, header_aligns=None, aligns=None, widths=None, _even_widths=False):
         """
         self.dataの行列の各フィールドを文字列にして返す
             各列の文字列幅を均一にする(全角文字が混じっていてもズレません)
@@ -807,87 +1871,35 @@ class TwoDimArray(object):
                 ・aligns: 各列のalignを設定する辞書{列インデックス: align} (align: 左詰め='<'、右詰め='>', 中央寄せ='^')
                 ・widths: 各列のwidthを設定する辞書{列インデックス: width}
             ※列インデックスで指定されていない他の全ての設定をNoneキーで設定できる
-        """
-        tda_data = self.data[row_start_idx:row_end_idx]
-        columns = row2column(tda_data)
 
-        #align設定
-        col_aligns = ['' for _ in columns] #''はalign無し(デフォルトのalign設定が適用される)
-        if aligns is not None and isinstance(aligns, dict):
-            other_align = aligns.get(None)
-            if other_align:
-                col_aligns = [other_align for _ in columns]
+            _even_widths: Trueならば各列のwidthを偶数にし、(フィールドの文字列, 各列のwidth)を返す(wrap_borderの枠用)
 
-            col_aligns = [aligns.get(col_idx) if aligns.get(col_idx) is not None else col_align 
-                          for col_idx, col_align in enumerate(col_aligns)]
-            #print(f'col_aligns: {col_aligns}(カスタム化)') ###
+            各フィールドは1度だけ文字列にして(_str_width_columns)文字列幅を求め、列の最大文字列幅(_column_layout)と埋める空白の数の両方に使う
+            書式指定は列毎にまとめて行う(_format_column参照)
+        """
+        tda_data = self._get_rows(row_start_idx, row_end_idx)
+        columns, str_columns, width_columns = _str_width_columns(tda_data, self.grouping_opt, self.precision)
+        col_aligns, h_aligns, col_max_widths = _column_layout([width_columns], header_aligns, aligns, widths, _even_widths)
 
-        #width設定
-        col_max_widths = _max_widths(columns, grouping_opt=self.grouping_opt, precision=self.precision) #各列の最大文字列幅
-        #print(f'col_max_widths: {col_max_widths}') ###
-        #print(f'widths: {widths}') ###
-        if widths is not None and isinstance(widths, dict):
-            other_width = widths.get(None)
-            if other_width:
-                c_widths = defaultdict(lambda:other_width)
-            else:
-                c_widths = defaultdict(lambda:0)
-            c_widths.update(widths)
-            col_max_widths = [c_widths[col_idx] if c_widths[col_idx] > col_max_width else col_max_width 
-                              for col_idx, col_max_width in enumerate(col_max_widths)]
-            #print(f'col_max_widths: {col_max_widths}(カスタム化)') ###
-
-        #ヘッダーalign設定
-        h_aligns = col_aligns[:] #初期設定はcol_aligns
-        if header_aligns is not None and isinstance(header_aligns, dict):
-            other_header_align = header_aligns.get(None)
-            if other_header_align:
-                h_aligns = [other_header_align for _ in h_aligns]
-
-            h_aligns = [header_aligns.get(col_idx) if header_aligns.get(col_idx) is not None else h_align
-                        for col_idx, h_align in enumerate(h_aligns)]
-        #print(f'h_aligns: {h_aligns}') ###
-
-        def get_format(row_idx, col_idx, field):
-            #align
-            if row_idx == self.header_idx: #ヘッダー
-                align = h_aligns[col_idx]
-            else:
-                align = col_aligns[col_idx]
-
-            #width
-            width = col_max_widths[col_idx] - _count_em(str(field))
-            if width <= 0:
-                #fieldが空だとwidthがゼロになるが、
-                #書式指定文字列の指定でalignが空('')で、かつ、widthがゼロだとValueErrorとなる
-                #そのためwidthがゼロの場合は空('')を返す
-                width = ''
-
-            #数字の区切り文字
-            grouping_option = ''
-            if self.grouping_opt:
-                if isinstance(field, str):
-                    pass
-                elif isinstance(field, int) or isinstance(field, float):
-                    grouping_option = '_' #アンダースコア以外にカンマも設定可能だがcsvの区切り文字と同じなのでカンマは使用しない
-
-            #精度
-            dot_precision_type = ''
-            if isinstance(field, float):
-                dot_precision_type = f'.{self.precision}f'
-
-            return f'{align}{width}{grouping_option}{dot_precision_type}'
-
-        def get_data(field):
-            if isinstance(field, str) or isinstance(field, int) or isinstance(field, float):
-                return field
-            else:
-                return str(field)
+        #列毎に書式指定(ヘッダーの行はヘッダーのalignで書式指定し直す)
+        fields_columns = [_format_column(*column_info, self.grouping_opt, self.precision)
+                          for column_info in zip(columns, str_columns, width_columns, col_aligns, col_max_widths)]
+        header_idx = self.header_idx
+        if header_idx is not None and 0 <= header_idx < len(tda_data):
+            for fields_column, column_info in zip(fields_columns, zip(columns, str_columns, width_columns, h_aligns, col_max_widths)):
+                column, str_column, width_column, h_align, col_max_width = column_info
+                header_formatter = _cell_formatter(h_align, col_max_width, self.grouping_opt, self.precision)
+                fields_column[header_idx] = header_formatter(column[header_idx], str_column[header_idx], width_column[header_idx])
 
-        return [[f'{get_data(col_data):{get_format(row_idx, col_idx, col_data)}}' for col_idx, col_data in enumerate(row_data)]
-                for row_idx, row_data in enumerate(tda_data)]
+        if all(len(row_data) == len(fields_columns) for row_data in tda_data):
+            fields_str = list(map(list, zip(*fields_columns)))
+        else:
+            fields_str = [list(row[:len(row_data)]) for row, row_data in zip(zip(*fields_columns), tda_data)] #元の行の長さに戻す
+        if _even_widths:
+            return fields_str, col_max_widths
+        return fields_str
 
-    def _tda_string_format(self, row_start_idx=0, row_end_idx=None, header_aligns=None, aligns=None, widths=None):
+    def _tda_string_format(self, row_start_idx=0, row_end_idx=None, header_aligns=None, aligns=None, widths=None, _remain_rows=(0, 0)):
         """
         self.dataの行列を文字列にして返す
             各列の文字列幅を均一にする(全角文字が混じっていてもズレません)
@@ -899,15 +1911,18 @@ class TwoDimArray(object):
                 ・widths: 各列のwidthを設定する辞書{列インデックス: width}
             ※列インデックスで指定されていない他の全ての設定をNoneキーで設定できる
         """
+        row_idxs = range(self._row_len())
         if row_start_idx is not None:
-            remain_toplines_num = len(self.data[:row_start_idx])
+            remain_toplines_num = len(row_idxs[:row_start_idx])
         else:
             remain_toplines_num = 0
 
         if row_end_idx is not None:
-            remain_bottomlines_num = len(self.data[row_end_idx:])
+            remain_bottomlines_num = len(row_idxs[row_end_idx:])
         else:
             remain_bottomlines_num = 0
+        remain_toplines_num += _remain_rows[0]
+        remain_bottomlines_num += _remain_rows[1]
 
         fields_str = self._fields_string_format(row_start_idx=row_start_idx, row_end_idx=row_end_idx, header_aligns=header_aligns, aligns=aligns, widths=widths)
         tda_str = '\n'.join([self._display_delimiter.join(row_data) for row_data in fields_str])
@@ -922,21 +1937,90 @@ class TwoDimArray(object):
     #------------------------------
     # 保存
     #------------------------------
-    def save(self, csv_file, mode='w', encoding=None, uniform=True):
+    def save(self, csv_file, mode='w', encoding=None, uniform=True, quoting=False, compression='infer'):
         """
         csvファイル(csv_file)にTwoDimArray(self.data)を保存する
             uniform=True: 各列の文字幅を均一にする
+                          先に全ての行を走査して各列の文字幅だけを求め、次に各行を揃えて書き込む
+            quoting=True: カンマ、ダブルクォート、改行を含むフィールドをダブルクォートで囲む(RFC 4180, フィールド内のダブルクォートは""にする)
+                          loadで元のフィールドとして読み込める
+            compression: 圧縮形式('gzip', 'bz2', 'xz', 圧縮しない場合はNone)
+                         'infer'ならばファイルの拡張子(.gz, .bz2, .xz)で決める
+                         mode='a'では圧縮したファイルの後ろに圧縮したデータを追加する(展開すると連結したデータになる)
+            行は_SAVE_CHUNK_ROWS行ずつ文字列にして書き込むので、表全体の文字列は作らない
+            (列指向やload(lazy=True)のTwoDimArrayでも全ての行のリストは作らない)
+            load(lazy=True)で読み込んでいるファイル自身に保存する場合は、一時ファイルに書き込んでから置き換える
+        """
+        if uniform:
+            line_chunks = self._uniform_line_chunks(quoting)
+        else:
+            line_chunks = ([','.join([_quote_field(field) if quoting else field for field in row]) for row in _field2striped_str(rows)]
+                           for rows in self._iter_row_chunks())
+
+        def write(path, compression):
+            with _open_text(path, mode, encoding=encoding, compression=compression) as f:
+                written = False
+                for lines in line_chunks:
+                    if lines:
+                        f.write('\n'.join(lines)+'\n')
+                        written = True
+                if not written: #空のTwoDimArrayも1行(空行)として保存する
+                    f.write('\n')
+
+        if 'a' not in mode and self._is_lazy() and os.path.exists(csv_file) and os.path.samefile(csv_file, self._data.path):
+            #遅延読み込みしているファイル自身に保存する場合は、読み込み中のファイルを切り詰めないように
+            #同じディレクトリの一時ファイルに書き込んでから置き換える
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(csv_file)), suffix='.tmp')
+            os.close(fd)
+            try:
+                write(tmp_file, _compression_of(csv_file, compression))
+                os.chmod(tmp_file, os.stat(csv_file).st_mode & 0o7777) #mkstempのパーミッション(0o600)を元のファイルに合わせる
+                os.replace(tmp_file, csv_file)
+            except BaseException:
+                os.remove(tmp_file)
+                raise
+        else:
+            write(csv_file, compression)
+
+    def _iter_row_chunks(self):
         """
-        with open(csv_file, mode, encoding=encoding) as f:
-            if uniform:
-                f.write(self._sprint()+'\n')
-            else:
-                f.write('\n'.join([','.join(row) for row in _field2striped_str(self.data)])+'\n')
+        行を_SAVE_CHUNK_ROWS行ずつのリストで順に返すジェネレータ
+            列指向やload(lazy=True)で保持していても、全ての行のリストは作らない
+        """
+        for start in range(0, self._row_len(), _SAVE_CHUNK_ROWS):
+            yield self._get_rows(start, start+_SAVE_CHUNK_ROWS)
+
+    def _uniform_line_chunks(self, quoting=False):
+        """
+        各列の文字幅を均一にした行の文字列を_SAVE_CHUNK_ROWS行分ずつのリストで順に返すジェネレータ(save(uniform=True)の処理)
+            _sprint()と同じ文字列になる(multiple-linesも展開する)
+            1回目の走査で各列の最大文字列幅だけを求め、2回目の走査で各行を文字列にする
+        """
+        delimiter = self.multiple_lines_delimiter if self.multiple_lines else None
+        grouping_opt, precision = self.grouping_opt, self.precision
+
+        def value_rows(rows):
+            for row in rows:
+                for line in ((row,) if delimiter is None else _multiple_lines_rows(row, delimiter)):
+                    yield [_save_field_value(field, quoting) for field in line]
+
+        #各列の最大文字列幅(書式指定は無いのでalignは全て'')
+        col_aligns, _, col_max_widths = _column_layout(_str_width_columns(list(value_rows(rows)), grouping_opt, precision)[2]
+                                                       for rows in self._iter_row_chunks())
+
+        #表示(_fields_string_format)と同じ書式関数で各フィールドを埋める
+        formatters = [_cell_formatter(align, width, grouping_opt, precision) for align, width in zip(col_aligns, col_max_widths)]
+        display_delimiter = self._display_delimiter
+        for rows in self._iter_row_chunks():
+            yield [display_delimiter.join([fmt(value, value_str, _width(value_str)) for fmt, value, value_str
+                                           in zip(formatters, row, _field2str([row], grouping_opt, precision)[0])])
+                   for row in value_rows(rows)]
 
-    def set_print_file(self, f_name=None, encoding=None):
+    def set_print_file(self, f_name=None, encoding=None, compression='infer'):
         """
         print関連のメソッドの出力先をファイル(f_name)に変更する
             Windowsの場合はOSに関連付けられたアプリケーションでファイルを開く処理も行う
+            compression: saveと同じ(圧縮したファイルに書き込む)
         """
         if f_name is None and encoding is None:
             self.print_file = TwoDimArray._DEFAULT_PRINT_FILE.copy() #初期化
@@ -948,12 +2032,12 @@ class TwoDimArray(object):
             mode = 'w' #f_nameファイルが無ければ作成
 
         try:
-            with open(f_name, mode=mode, encoding=encoding) as f:
+            with _open_text(f_name, mode=mode, encoding=encoding, compression=compression) as f:
                 pass
         except:
             raise
 
-        self.print_file.update({'file': f_name, 'encoding': encoding})
+        self.print_file.update({'file': f_name, 'encoding': encoding, 'compression': compression})
         if _OPEN_CMD:
             subprocess.run(_OPEN_CMD + [f_name]) #OSに関連付けられたアプリケーションでファイルを開く
 
@@ -963,9 +2047,10 @@ class TwoDimArray(object):
         """
         f_name = self.print_file['file']
         encoding = self.print_file['encoding']
+        compression = self.print_file.get('compression', 'infer') #compressionが無いprint_file(以前の形式の辞書)は拡張子で決める
 
-        with open(f_name, mode='w', encoding=encoding) as f:
-            root, ext = os.path.splitext(f_name)
+        with _open_text(f_name, mode='w', encoding=encoding, compression=compression) as f:
+            root, ext = os.path.splitext(_strip_compression_ext(f_name, compression))
             if ext == '.html':
                 f.write(f'<PRE>\n{strings}\n</PRE>') #ブラウザで表示できるように<PRE>タグ(整形済みテキスト)で囲む
             else:
@@ -979,7 +2064,7 @@ class TwoDimArray(object):
         TwoDimArrayのヘッダーを返す
         """
         if self._exists_header():
-            return self.data[self.header_idx]
+            return self._get_row(self.header_idx)
 
     def get_header_idx(self, value, start=None, stop=None):
         """
@@ -1051,13 +2136,22 @@ class TwoDimArray(object):
                            Falseならば完全一致
             row_idx, col_idxで検索範囲を指定できる
             row_idx, col_idxはsliceも指定可能
+            インデックスがあれば使う(完全一致はcreate_index、部分一致はcreate_string_index参照)
         """
+        if partial_match:
+            idxs = self._search_string_index(value, row_idx, col_idx)
+        else:
+            idxs = self._search_index(value, row_idx, col_idx)
+        if idxs is not None:
+            yield from idxs
+            return
+
         if row_idx is None:
-            rows = enumerate(self.data)
+            rows = enumerate(self._get_rows())
         elif isinstance(row_idx, slice):
-            rows = enumerate(self.data[row_idx], start=row_idx.start)
+            rows = enumerate(self._get_rows(row_idx.start, row_idx.stop), start=row_idx.start)
         else:
-            rows = enumerate(self.data[row_idx:row_idx+1], start=row_idx)
+            rows = enumerate(self._get_rows(row_idx, row_idx+1), start=row_idx)
 
         if col_idx is None:
             cols = lambda row: enumerate(row)
@@ -1075,77 +2169,335 @@ class TwoDimArray(object):
                     if value == field:
                         yield (r_idx, c_idx)
 
-    def get_field_value(self, row_idx, col_idx):
-        """
-        TwoDimArrayにインデックスでアクセスしてその値を返す
+    #------------------------------
+    # インデックス
+    #------------------------------
+    def create_index(self, *col_idxs):
         """
-        value = self.data[row_idx][col_idx]
-        return value
+        列の値から行インデックスを引くハッシュインデックス{値: [行インデックス, ...]}を作成する
+            col_idxs: インデックス化する列(指定しなければ全ての列)
+            get_field_idx, get_field_idx_all, inquire_field_value, __call__の完全一致の検索は、
+            検索範囲のインデックス化した列をインデックスで、その他の列を走査して検索する
+            ※inquire_field_valueなど全ての列を検索する場合は、全ての列をインデックス化すると速い
 
-    def inquire_field_value(self, row_value, col_value):
-        """
-        行(フィールド値がrow_valueの行)と列(フィールド値がcol_valueの列)が交差するフィールド値を返す
+            インデックスはデータが変更されると(self.dataにアクセスした場合も)次の検索時に作り直す
         """
-        row_idxs = [row_idx for row_idx, col_idx in self.get_field_idx_all(row_value)]
-        col_idxs = [col_idx for row_idx, col_idx in self.get_field_idx_all(col_value)]
-        if not row_idxs or not col_idxs:
-            return None
-        lengths = (len(row_idxs), len(col_idxs))
-
-        field_values = [self.get_field_value(row_idx, col_idx) for row_idx, col_idx in product(row_idxs, col_idxs)]
-        if all(length==1 for length in lengths):
-            return field_values[0]
-        elif any(length==1 for length in lengths):
-            return field_values
+        if col_idxs:
+            col_len = self._col_len()
+            self._index_col_idxs = {col_idx + col_len if col_idx < 0 else col_idx for col_idx in col_idxs}
         else:
-            #row_idxs、col_idxsが共に複数ある場合は行毎に分ける
-            return [field_values[i:i+len(col_idxs)] for i in range(len(field_values))[::len(col_idxs)]]
+            self._index_col_idxs = True #全ての列
+        self._data_changed()
 
-    #------------------------------
-    # フィールド変換
-    #------------------------------
-    def field2striped_str(self):
+    def create_string_index(self):
         """
-        文字列フィールドの左右の空白を削除(strip)
+        文字列の部分一致検索用のインデックス(3文字ずつの文字列(trigram)から、それを含むフィールドを引く辞書)を作成する
+            get_string_idx, get_string_idx_allは検索する文字列のtrigramを全て含むフィールドだけを、
+            research_fieldはpatternが必ず含む文字列で絞り込んだフィールドだけを評価する
+            ※print関連のメソッドがmultiple-linesのフィールドを探す検索にも使われる
+
+            インデックスは最初の検索時に作成し、replace_fieldでは変更したフィールドの分だけ更新する
+            その他のデータの変更では(self.dataにアクセスした場合も)次の検索時に作り直す
         """
-        self.data = _field2striped_str(self.data)
+        self._string_index_enabled = True
+        self._data_changed()
 
-    def field2int(self):
+    def drop_index(self):
         """
-        フィールドをintに変換できたらintに変換する
+        create_index, create_string_indexで作成したインデックスを削除する
         """
-        self.data = [[_chg_int(field) for field in row] for row in self.data]
+        self._index_col_idxs = None
+        self._string_index_enabled = False
+        self._data_changed()
 
-    def field2float(self):
+    def _build_indexes(self):
         """
-        フィールドをfloatに変換できたらfloatに変換する
+        インデックス化する列のインデックスを作成し、(列の長さ, {列インデックス: (インデックス, ハッシュできない値の行インデックスのリスト)})を返す
         """
-        self.data = [[_chg_float(field) for field in row] for row in self.data]
+        if self._columns is not None:
+            columns = self._columns
+            col_len = len(columns)
+        else:
+            self._load_lazy_rows()
+            data = self._data
+            col_len = max(map(len, data), default=0)
 
-    def money2int(self):
+        if self._index_col_idxs is True:
+            col_idxs = range(col_len)
+        else:
+            col_idxs = [col_idx for col_idx in sorted(self._index_col_idxs) if col_idx < col_len]
+
+        indexes = {}
+        for col_idx in col_idxs:
+            if self._columns is not None:
+                column = columns[col_idx]
+            else:
+                column = [row[col_idx] if col_idx < len(row) else _MISSING for row in data] #欠けている箇所は検索対象外
+
+            index = defaultdict(list)
+            unhashables = []
+            for row_idx, field in enumerate(column):
+                if field is _MISSING:
+                    continue
+                try:
+                    index[field].append(row_idx)
+                except TypeError: #ハッシュできない値は検索時に比較する
+                    unhashables.append(row_idx)
+            indexes[col_idx] = (index, unhashables)
+
+        return (col_len, indexes)
+
+    def _search_index(self, value, row_idx=None, col_idx=None):
         """
-        フィールドの通貨文字列をintに変換できたらintに変換する
+        インデックスを使ってvalueのフィールドのインデックスを検索し、[(行インデックス, 列インデックス), ...]を返す(_get_field_idxの処理)
+            インデックスが無い、またはインデックスで扱えない検索条件(負のインデックスなど)の場合はNoneを返す
         """
-        self.data = [[_chg_money2int(field) for field in row] for row in self.data]
+        if self._index_col_idxs is None or not _is_hashable(value):
+            return None
 
-    def money2float(self):
+        row_range = _idx2range(row_idx, self._row_len())
+        if row_range is None:
+            return None
+        if self._indexes is None:
+            self._indexes = self._build_indexes()
+        col_len, indexes = self._indexes
+        col_range = _idx2range(col_idx, col_len)
+        if col_range is None:
+            return None
+
+        if value != value: #NaNはどのフィールドとも一致しない
+            return []
+
+        idxs = []
+        for c_idx in col_range:
+            if c_idx in indexes:
+                index, unhashables = indexes[c_idx]
+                row_idxs = index.get(value, [])
+                row_idxs = row_idxs[bisect_left(row_idxs, row_range.start):bisect_left(row_idxs, row_range.stop)] #行インデックスは昇順
+                row_idxs += [r_idx for r_idx in unhashables if r_idx in row_range and self.get_field_value(r_idx, c_idx) == value]
+            else: #インデックス化していない列は走査する
+                column = (self._get_row_field(r_idx, c_idx) for r_idx in row_range)
+                row_idxs = [r_idx for r_idx, field in zip(row_range, column) if field is not _MISSING and field == value]
+            idxs.extend((r_idx, c_idx) for r_idx in row_idxs)
+
+        return sorted(idxs)
+
+    def _build_string_index(self):
         """
-        フィールドの通貨文字列をfloatに変換できたらfloatに変換する
+        文字列のインデックスを作成し、(列の長さ, {trigram: {フィールドのID, ...}}, {3文字未満のフィールドのID, ...})を返す
+            フィールドのIDは 行インデックス*列の長さ + 列インデックス
+            文字列以外のフィールドはstr()で文字列にしてインデックス化する
         """
-        self.data = [[_chg_money2float(field) for field in row] for row in self.data]
+        if self._columns is not None:
+            rows = zip(*self._columns)
+            width = len(self._columns)
+        else:
+            self._load_lazy_rows()
+            rows = self._data
+            width = max(map(len, rows), default=0)
 
-    def refresh_field(self):
+        grams = defaultdict(set)
+        shorts = set()
+        for row_idx, row in enumerate(rows):
+            for col_idx, field in enumerate(row):
+                _add_grams(grams, shorts, row_idx*width + col_idx, field)
+
+        return (width, grams, shorts)
+
+    def _string_candidates(self, string):
         """
-        各フィールドをリフレッシュさせる
-            各フィールドを文字列に変換、文字列の左右の空白を削除(strip)、intに変換できる文字列はintに、floatに変換できる文字列はfloatに変換する
+        stringを含む可能性のあるフィールドのIDのsetを返す(stringが空ならNone)
         """
-        self.data = [[_str2int_or_float(field) for field in row] for row in _field2striped_str(self.data)]
+        if not string:
+            return None
+
+        if self._string_index is None:
+            self._string_index = self._build_string_index()
+        width, grams, shorts = self._string_index
+
+        if len(string) >= 3: #stringの全てのtrigramを含むフィールド
+            postings = sorted([grams.get(string[i:i+3], set()) for i in range(len(string)-2)], key=len)
+            return postings[0].intersection(*postings[1:])
+        else: #stringを含むtrigramを持つフィールドと3文字未満のフィールド
+            return shorts.union(*[cell_ids for gram, cell_ids in grams.items() if string in gram])
+
+    def _search_string_index(self, string, row_idx=None, col_idx=None):
+        """
+        文字列のインデックスを使ってstringを含む文字列のフィールドのインデックスを検索し、[(行インデックス, 列インデックス), ...]を返す
+        (_get_field_idxの処理)
+            インデックスが無い、またはインデックスで扱えない検索条件の場合はNoneを返す
+        """
+        if not self._string_index_enabled or not isinstance(string, str):
+            return None
+
+        row_range = _idx2range(row_idx, self._row_len())
+        if row_range is None:
+            return None
+        candidates = self._string_candidates(string)
+        if candidates is None:
+            return None
+        width = self._string_index[0]
+        col_range = _idx2range(col_idx, width)
+        if col_range is None:
+            return None
+
+        idxs = []
+        for cell_id in candidates:
+            r_idx, c_idx = divmod(cell_id, width)
+            if r_idx in row_range and c_idx in col_range:
+                field = self.get_field_value(r_idx, c_idx)
+                if isinstance(field, str) and string in field:
+                    idxs.append((r_idx, c_idx))
+
+        return sorted(idxs)
+
+    def _research_candidates(self, pattern):
+        """
+        research_fieldでpatternにヒットする可能性のあるフィールドのIDのsetを返す
+            multiple-linesのフィールドは行毎に評価されるので候補に含める
+            文字列のインデックスが無い、またはpatternが必ず含む文字列が分からない場合はNoneを返す
+        """
+        if not self._string_index_enabled:
+            return None
+
+        literal = _required_literal(pattern)
+        if literal is None:
+            return None
+
+        candidates = self._string_candidates(literal)
+        if self.multiple_lines and self.multiple_lines_delimiter:
+            candidates |= self._string_candidates(self.multiple_lines_delimiter)
+        return candidates
+
+    def _get_row_field(self, row_idx, col_idx):
+        """
+        フィールド値を返す(行が短くて欠けている箇所は_MISSINGを返す)
+        """
+        if self._columns is not None:
+            return self._columns[col_idx][row_idx]
+
+        row = self._data[row_idx]
+        return row[col_idx] if col_idx < len(row) else _MISSING
+
+    def get_field_value(self, row_idx, col_idx):
+        """
+        TwoDimArrayにインデックスでアクセスしてその値を返す
+        """
+        if self._columns is not None:
+            return self._columns[col_idx][row_idx]
+
+        value = self._data[row_idx][col_idx]
+        return value
+
+    def inquire_field_value(self, row_value, col_value):
+        """
+        行(フィールド値がrow_valueの行)と列(フィールド値がcol_valueの列)が交差するフィールド値を返す
+        """
+        row_idxs = [row_idx for row_idx, col_idx in self.get_field_idx_all(row_value)]
+        col_idxs = [col_idx for row_idx, col_idx in self.get_field_idx_all(col_value)]
+        if not row_idxs or not col_idxs:
+            return None
+        lengths = (len(row_idxs), len(col_idxs))
+
+        field_values = [self.get_field_value(row_idx, col_idx) for row_idx, col_idx in product(row_idxs, col_idxs)]
+        if all(length==1 for length in lengths):
+            return field_values[0]
+        elif any(length==1 for length in lengths):
+            return field_values
+        else:
+            #row_idxs、col_idxsが共に複数ある場合は行毎に分ける
+            return [field_values[i:i+len(col_idxs)] for i in range(len(field_values))[::len(col_idxs)]]
+
+    #------------------------------
+    # フィールド変換
+    #------------------------------
+    def field2striped_str(self):
+        """
+        文字列フィールドの左右の空白を削除(strip)
+        """
+        self.data = _field2striped_str(self.data)
+
+    def field2int(self):
+        """
+        フィールドをintに変換できたらintに変換する
+        """
+        self.data = [[_chg_int(field) for field in row] for row in self.data]
+
+    def field2float(self):
+        """
+        フィールドをfloatに変換できたらfloatに変換する
+        """
+        self.data = [[_chg_float(field) for field in row] for row in self.data]
+
+    def money2int(self):
+        """
+        フィールドの通貨文字列をintに変換できたらintに変換する
+        """
+        self.data = [[_chg_money2int(field) for field in row] for row in self.data]
+
+    def money2float(self):
+        """
+        フィールドの通貨文字列をfloatに変換できたらfloatに変換する
+        """
+        self.data = [[_chg_money2float(field) for field in row] for row in self.data]
+
+    def refresh_field(self):
+        """
+        各フィールドをリフレッシュさせる
+            各フィールドを文字列に変換、文字列の左右の空白を削除(strip)、intに変換できる文字列はintに、floatに変換できる文字列はfloatに変換する
+        """
+        self.data = _str_field2int_or_float(_field2striped_str(self.data))
 
     def replace_field(self, before_value, after_value):
         """
         before_valueのフィールドをafter_valueにする
-        """
-        self.data = [[after_value if field == before_value else field for field in row] for row in self.data]
+            作成済みのインデックスは変更したフィールドの分だけ更新する
+        """
+        track = self._indexes is not None or self._string_index is not None
+        changes = [] #変更したフィールド[(行インデックス, 列インデックス, 変更前の値), ...]
+
+        if self._columns is None:
+            self._load_lazy_rows()
+            tda_data = []
+            for row_idx, row in enumerate(self._data):
+                col_idxs = [col_idx for col_idx, field in enumerate(row) if field == before_value]
+                if col_idxs:
+                    row = row[:] #変更する行だけコピーする
+                    for col_idx in col_idxs:
+                        if track:
+                            changes.append((row_idx, col_idx, row[col_idx]))
+                        row[col_idx] = after_value
+                tda_data.append(row)
+            self._data = tda_data
+
+        else: #列指向で保持している場合は列毎に置き換える
+            for col_idx, column in enumerate(self._columns):
+                if isinstance(column, _CategoryColumn) and _is_hashable(before_value) and _is_hashable(after_value):
+                    if before_value in column.lookup:
+                        if track:
+                            before_code = column.lookup[before_value]
+                            old_value = column.categories[before_code]
+                            changes += [(row_idx, col_idx, old_value) for row_idx, code in enumerate(column.codes) if code == before_code]
+                        column.replace(before_value, after_value) #値のリストだけを置き換える
+                    continue
+
+                row_idxs = [row_idx for row_idx, field in enumerate(column) if field == before_value]
+                if not row_idxs:
+                    continue
+                new_column = list(column)
+                for row_idx in row_idxs:
+                    if track:
+                        changes.append((row_idx, col_idx, new_column[row_idx]))
+                    new_column[row_idx] = after_value
+
+                if isinstance(column, _ArrayColumn):
+                    new_column = _ArrayColumn.from_column(new_column) or new_column
+                elif isinstance(column, _CategoryColumn):
+                    new_column = _CategoryColumn.from_column(new_column) or new_column
+                self._columns[col_idx] = new_column
+
+        if track:
+            self._fields_changed(changes, after_value)
 
     def resub_field(self, pattern, repl):
         """
@@ -1161,8 +2513,30 @@ class TwoDimArray(object):
         """
         各フィールドをre.search(pattern, field)してヒットしたfield値以外は空('')にしたTwoDimArrayインスタンスを返す
             フィールドは文字列に変換してからre.search関数で評価される
+            文字列のインデックス(create_string_index参照)があれば、patternが必ず含む文字列で評価するフィールドを絞り込む
         """
-        chg_tda = self.map_field(lambda field: field if re.search(pattern, str(field)) else '')
+        func = lambda field: field if re.search(pattern, str(field)) else ''
+        candidates = self._research_candidates(pattern)
+        if candidates is None:
+            chg_tda = self.map_field(func)
+            chg_tda._copy_property(self)
+            return chg_tda
+
+        #map_fieldと同じ処理を候補のフィールドだけに行う(候補以外は必ず空('')になる)
+        if self.multiple_lines:
+            func = Wrapper.support_multiplelines(func, self.multiple_lines_delimiter)
+        func = Wrapper.non_error(func)
+
+        data = self._get_rows()
+        row_range = range(len(data))[self.data_row_range]
+        new_rows = {row_idx: ['']*len(data[row_idx]) for row_idx in row_range}
+        width = self._string_index[0]
+        for cell_id in candidates:
+            row_idx, col_idx = divmod(cell_id, width)
+            if row_idx in new_rows:
+                new_rows[row_idx][col_idx] = func(data[row_idx][col_idx])
+
+        chg_tda = TwoDimArray([new_rows.get(row_idx, row) for row_idx, row in enumerate(data)])
         chg_tda._copy_property(self)
         return chg_tda
 
@@ -1187,12 +2561,22 @@ class TwoDimArray(object):
         指定された列をコピーして返す
             col_idxはsliceも指定可能
         """
-        columns = row2column(self.data)
+        if self._columns is None and isinstance(col_idx, int): #1列だけなら行と列を入れ替えずに取り出す
+            self._load_lazy_rows()
+            col_len = max(map(len, self._data))
+            idx = col_idx + col_len if col_idx < 0 else col_idx
+            if not 0 <= idx < col_len:
+                return None
+            return [row[idx] if idx < len(row) else '' for row in self._data] #欠けている箇所は空('')
+
+        columns = self._get_columns()
         try:
             column = columns[col_idx]
         except IndexError:
             return None
 
+        if columns is self._columns: #列指向で保持しているデータはコピーして返す
+            column = [list(col) for col in column] if isinstance(col_idx, slice) else list(column)
         return column
 
     def del_column(self, col_idx):
@@ -1200,13 +2584,13 @@ class TwoDimArray(object):
         指定された列の削除
             col_idxはsliceも指定可能
         """
-        columns = row2column(self.data)
+        columns = self._get_columns()
         try:
             del(columns[col_idx])
         except IndexError:
             pass
 
-        self.data = row2column(columns)
+        self._set_columns(columns)
 
     def remove_column(self, col_idx):
         """
@@ -1229,27 +2613,38 @@ class TwoDimArray(object):
         """
         col_idx1の列とcol_idx2の列を入れ替える
         """
-        col1 = self.get_column(col_idx1)
-        col2 = self.get_column(col_idx2)
+        #行と列の入れ替えは1回だけ行い、列のリスト上でchg_column(del_column + add_column)と同じ処理をする
+        columns = self._get_columns()
+        col1 = _get_item(columns, col_idx1)
+        col2 = _get_item(columns, col_idx2)
 
         if col1:
-            self.chg_column(col_idx2, col1) #col1の列がcol2のあった場所に入る
+            columns = self._chg_column(columns, col_idx2, col1) #col1の列がcol2のあった場所に入る
         else:
-            self.del_column(col_idx2) #col1が無いので、col2の列が移動して元の場所から消える
+            _del_item(columns, col_idx2) #col1が無いので、col2の列が移動して元の場所から消える
 
         if col2:
-            self.chg_column(col_idx1, col2) #col2の列がcol1のあった場所に入る
+            columns = self._chg_column(columns, col_idx1, col2) #col2の列がcol1のあった場所に入る
         else:
-            self.del_column(col_idx1) #col2が無いので、col1の列が移動して元の場所から消える
+            _del_item(columns, col_idx1) #col2が無いので、col1の列が移動して元の場所から消える
+
+        self._set_columns(columns)
+
+    def _chg_column(self, columns, col_idx, new_column):
+        """
+        columnsのcol_idxの列をnew_columnに置き換える(chg_colidxの処理)
+        """
+        _del_item(columns, col_idx)
+        return self._add_column(columns, col_idx, new_column)
 
     def add_column(self, col_idx, new_column):
         """
         列データ(new_column)をTwoDimArray(self.data)の指定インデックス(col_idx)に追加する
             col_idxがNoneならば列データをTwoDimArrayの最後尾に追加する
         """
-        columns = row2column(self.data) #行と列の入れ替え
+        columns = self._get_columns() #行と列の入れ替え
         columns = self._add_column(columns, col_idx, new_column)
-        self.data = row2column(columns) #再び行と列の入れ替えをして元に戻す
+        self._set_columns(columns) #再び行と列の入れ替えをして元に戻す
 
     def extend_columns(self, col_idx, new_columns):
         """
@@ -1257,7 +2652,7 @@ class TwoDimArray(object):
             col_idxで指定したインデックスから拡張する
             col_idxがNoneならばTwoDimArrayの最後尾から拡張する
         """
-        columns = row2column(self.data) #行と列の入れ替え
+        columns = self._get_columns() #行と列の入れ替え
 
         for idx, new_column in enumerate(new_columns):
             if col_idx is None:
@@ -1265,7 +2660,7 @@ class TwoDimArray(object):
             else:
                 columns = self._add_column(columns, col_idx+idx, new_column)
 
-        self.data = row2column(columns) #再び行と列の入れ替えをして元に戻す
+        self._set_columns(columns) #再び行と列の入れ替えをして元に戻す
 
     def _add_column(self, columns, col_idx, new_column):
         """
@@ -1276,17 +2671,17 @@ class TwoDimArray(object):
             col_idx = len(columns)
 
         new_column = [_str2striped_str(field) for field in new_column] #文字列のフィールドをstrip()して左右の空白削除
-        new_column = [_str2int_or_float(field) for field in new_column] #intに変換できる文字列はintに、floatに変換できる文字列はfloatに変換
+        new_column = _convert_column(new_column, _infer_dtype(new_column)) #intに変換できる文字列はintに、floatに変換できる文字列はfloatに変換
 
         if col_idx <= len(columns) - 1: #col_idxがself.dataの範囲内の場合
             #print(f'col_idx: {col_idx}, len(columns)-1: {len(columns)-1}') ###
             columns.insert(col_idx, new_column)
         else:
             blank_col_num = col_idx - len(columns)
-            blank_col = ('',) * max([len(col) for col in columns])
-            #print(f'blank_col_num: {blank_col_num}'); print(f'blank_col: {blank_col}') ###
+            blank_col_len = max([len(col) for col in columns])
+            #print(f'blank_col_num: {blank_col_num}'); print(f'blank_col_len: {blank_col_len}') ###
 
-            columns += [blank_col,]*blank_col_num #ブランク追加
+            columns += [['']*blank_col_len for _ in range(blank_col_num)] #ブランク追加
             columns.append(new_column)
 
         return columns
@@ -1295,14 +2690,48 @@ class TwoDimArray(object):
         """
         列のインデックスの並び(col_idxs)の通りにTwoDimArrayを再構築したTwoDimArrayインスタンスを返す
         """
-        columns = row2column(self.data)
-        tda_data = row2column([columns[col_idx] for col_idx in col_idxs if col_idx <= len(columns)-1])
-        if not tda_data:
-            tda_data = [['']]
+        columns = self._get_columns()
+        new_columns = [columns[col_idx] for col_idx in col_idxs if col_idx <= len(columns)-1]
+        if columns is self._columns: #列指向で保持しているデータはコピーする
+            new_columns = [list(col) for col in new_columns]
 
-        new_tda = TwoDimArray(tda_data)
-        new_tda._copy_property(self)
-        return new_tda
+        return self._columns2tda(new_columns)
+
+    def compact_columns(self, *col_idxs):
+        """
+        数値の列をarray.array(intだけの列は'q'、floatを含む列は'd')で保持してメモリ使用量を減らす
+            col_idxs: 対象の列(指定しなければ全ての列)
+            空('')のフィールドはビット列で、ヘッダーなど少数の数値以外のフィールドは個別に保持する
+            数値以外のフィールドが多い列はそのまま
+
+            column_majorをTrueにして列指向で保持する
+            get_field_value, map_columns, describe, print関連のメソッドは列指向のまま処理するが、
+            self.dataにアクセスすると行指向(通常のリスト)に戻る
+        """
+        self._convert_storage(_ArrayColumn, col_idxs)
+
+    def categorize_columns(self, *col_idxs):
+        """
+        少数の文字列が繰り返される列をコード(整数)と値のリストで保持してメモリ使用量を減らす
+            col_idxs: 対象の列(指定しなければ全ての列)
+            文字列以外のフィールドがある列や、値の種類が行数の半分より多い列はそのまま
+            counter_column, groupby, cross_count, replace_fieldは文字列の代わりにコードで処理する
+
+            column_majorをTrueにして列指向で保持する(compact_columnsと同じ)
+        """
+        self._convert_storage(_CategoryColumn, col_idxs)
+
+    def _convert_storage(self, column_class, col_idxs):
+        """
+        列をcolumn_class(_ArrayColumnか_CategoryColumn)に変換する(compact_columnsとcategorize_columnsの共通処理)
+        """
+        self.column_major = True
+        columns = self._get_columns()
+        for col_idx in (col_idxs or range(len(columns))):
+            if not isinstance(columns[col_idx], (_ArrayColumn, _CategoryColumn)):
+                new_column = column_class.from_column(columns[col_idx])
+                if new_column is not None:
+                    columns[col_idx] = new_column
         
     #------------------------------
     # row操作
@@ -1311,7 +2740,8 @@ class TwoDimArray(object):
         """
         行のインデックスの並び(row_idxs)の通りにTwoDimArrayを再構築したTwoDimArrayインスタンスを返す
         """
-        tda_data = [self.data[row_idx] for row_idx in row_idxs if row_idx <= len(self.data)-1]
+        row_len = self._row_len()
+        tda_data = [self._get_row(row_idx) for row_idx in row_idxs if row_idx <= row_len-1] #列指向や遅延読み込みでも全体は変換しない
         if not tda_data:
             tda_data = [['']]
 
@@ -1336,7 +2766,11 @@ class TwoDimArray(object):
     def fill(self, fillvalue='', row_start_idx=0, row_end_idx=None):
         """
         行範囲[row_start_idx:row_end_idx]内の行列で欠けている箇所をfillvalueで埋める
+            ※列指向で保持している場合は欠けている箇所が無いので何もしない
         """
+        if self._columns is not None:
+            return
+
         tda_data = [*self.data[0:row_start_idx],
                     *[list(row) for row in zip_longest(*zip_longest(*self.data[row_start_idx:row_end_idx], fillvalue=fillvalue))],
                     *([] if row_end_idx is None else self.data[row_end_idx:])
@@ -1349,17 +2783,27 @@ class TwoDimArray(object):
             文字列のフィールドはstripしてから空判定する
         """
         if row:
-            not_empty_row_idx = [row_idx for row_idx, row in enumerate(self.data) if any([field.strip() if isinstance(field, str) else field for field in row])]
-            if len(not_empty_row_idx) != len(self.data):
-                new_tda = self.arrange_rows(*not_empty_row_idx)
-                self.data = new_tda.data
+            if self._columns is not None:
+                rows = zip(*self._columns)
+            else:
+                rows = self.data
+            not_empty_row_idx = [row_idx for row_idx, row in enumerate(rows) if any([field.strip() if isinstance(field, str) else field for field in row])]
+            if len(not_empty_row_idx) != self._row_len():
+                if self._columns is not None and not_empty_row_idx:
+                    self._set_columns([[col[row_idx] for row_idx in not_empty_row_idx] for col in self._columns])
+                else:
+                    new_tda = self.arrange_rows(*not_empty_row_idx)
+                    self.data = new_tda.data
 
         if col:
-            columns = row2column(self.data)
+            columns = self._get_columns()
             not_empty_col_idx = [col_idx for col_idx, col in enumerate(columns) if any([field.strip() if isinstance(field, str) else field for field in col])]
             if len(not_empty_col_idx) != len(columns):
                 new_tda = self.arrange_columns(*not_empty_col_idx)
-                self.data = new_tda.data
+                if new_tda._columns is not None:
+                    self._set_columns(new_tda._columns)
+                else:
+                    self.data = new_tda.data
 
     @set_row_range
     def filter(self, func=None, row_start_idx=0, row_end_idx=None):
@@ -1417,7 +2861,18 @@ class TwoDimArray(object):
             func = Wrapper._arg_of_flatten_multiplelines_list(func, self.multiple_lines_delimiter)
         func = Wrapper.non_error(func)
 
-        return list(map(func, row2column(self.data[row_start_idx:row_end_idx])))
+        return list(map(func, self._range_columns(row_start_idx, row_end_idx)))
+
+    def _range_columns(self, row_start_idx=None, row_end_idx=None):
+        """
+        行範囲[row_start_idx:row_end_idx]の列のリストを返す(map_columnsとdescribeの共通処理)
+            列指向で保持していても行指向に戻さない
+        """
+        if self._columns is not None:
+            return [col[row_start_idx:row_end_idx] for col in self._columns]
+
+        self._load_lazy_rows()
+        return row2column(self._data[row_start_idx:row_end_idx])
 
     @set_row_range
     def cal_columns(self, col_idxs, func=None, row_start_idx=0, row_end_idx=None):
@@ -1436,15 +2891,19 @@ class TwoDimArray(object):
         columns = [self.get_column(col_idx)[row_start_idx:row_end_idx] for col_idx in col_idxs]
         args = row2column(columns)
 
-        top = ['' for _ in range(len(self.data[0:row_start_idx]))]
-        bottom = [] if row_end_idx is None else ['' for _ in range(len(self.data[row_end_idx:]))]
+        row_idxs = range(self._row_len())
+        top = ['' for _ in range(len(row_idxs[0:row_start_idx]))]
+        bottom = [] if row_end_idx is None else ['' for _ in range(len(row_idxs[row_end_idx:]))]
         return top + [func(*arg) for arg in args] + bottom
 
     def row2column(self):
         """
         TwoDimArrayの行と列を入れ替える
         """
-        self.data = row2column(self.data)
+        if self._columns is not None:
+            self.data = [list(col) for col in self._columns] #列指向で保持していれば各列がそのまま行になる
+        else:
+            self.data = row2column(self.data)
 
     def tda2list(self):
         """
@@ -1577,20 +3036,65 @@ class TwoDimArray(object):
     # データ集計
     #------------------------------
     @set_row_range
-    def groupby(self, grouping_col_idxs, target_col_idxs=None, func=None, row_start_idx=0, row_end_idx=None):
+    def groupby(self, grouping_col_idxs, target_col_idxs=None, func=None, row_start_idx=0, row_end_idx=None, aggs=None, workers=None):
         """
         選択した列のフィールド値でグループ化し集計したTwoDimArrayインスタンスを返す
             grouping_col_idxs: グループ化対象の列
             target_col_idxs: 集計対象の列(Noneならgrouping_col_idxs以外の全ての列)
             func: 集計関数(target_col_idxsを集計する関数)
                   funcがエラーになる場合は空文字('')を返す
-        """
+            aggs: 列ごとの集計の辞書{列: 集計 or 集計のリスト}(指定するとtarget_col_idxsとfuncは使わない)
+                  列はヘッダーの値か列インデックスで指定する
+                  集計は'count', 'sum', 'mean', 'min', 'max', 'median', 'variance', 'stdev'か集計関数
+                  (describeと同じく数字のフィールドのみを集計し、エラーになる場合は空文字('')を返す)
+                  グループごとの行のリストは作らず、1パスで各集計を更新する(medianと_ACCUMULATOR_FUNCS以外の集計関数は数字のリストを保持する)
+                      例: groupby(c['Sex'], aggs={'Height(cm)': ['mean', 'max'], 'Weight(kg)': 'sum'})
+                  行は_GROUPBY_BLOCK_ROWS行ずつのブロックで集計してから統合する(ブロックの区切りはworkersの数によらないので、結果はworkersの数によらない)
+                  (floatの'sum'はブロック毎の合計を足すので、全ての行を順にsum()で足した値とは末尾の桁が異なることがある)
+            workers: aggsと同時に指定すると、load(lazy=True)で読み込んだ表のブロックをworkers個のプロセス(ProcessPoolExecutor)で集計する
+                     各プロセスはファイルを開いてブロックのバイト範囲を区切り・型変換し、グループ毎の集計(_Accumulator)だけを返す
+                     load(lazy=True)以外の表(行が既にメモリにある表)と、負の列インデックスを指定した場合はこのプロセスで集計する
+                     dtypesに関数を指定して読み込んだ場合はpickleできる関数(モジュールのトップレベルの関数など)にすること
+                     spawnでプロセスを起動する環境(Windows, macOS)ではif __name__ == '__main__':の中で呼び出すこと
+                         with load('huge.csv', header_idx=0, lazy=True) as tda:
+                             tda.groupby(tda['Sex'], aggs={'Height(cm)': 'mean'}, workers=32).print2()
+        """
+        if workers is not None:
+            if aggs is None:
+                raise ValueError('workersはaggsと同時に指定してください')
+            if workers < 1:
+                raise ValueError(f'workersは1以上を指定してください: {repr(workers)}')
         if func is None:
             func = lambda fields: self.multiple_lines_delimiter.join(map(str, fields))
 
         if not hasattr(grouping_col_idxs, '__iter__'): #指定インデックスが1つのみの場合
             grouping_col_idxs = (grouping_col_idxs,)
 
+        if aggs is not None:
+            return self._groupby_aggs(tuple(grouping_col_idxs), aggs, row_start_idx, row_end_idx, workers)
+
+        #tupleに統一
+        grouping_col_idxs = tuple(grouping_col_idxs)
+        target_col_idxs = self._groupby_target_col_idxs(grouping_col_idxs, target_col_idxs)
+        #print(f'grouping_col_idxs: {grouping_col_idxs}') ###
+        #print(f'target_col_idxs: {target_col_idxs}') ###
+
+        group_dict = self._group_rows(grouping_col_idxs, target_col_idxs, row_start_idx, row_end_idx)
+        #print(group_dict) ###
+
+        func = Wrapper.non_error(func) #func処理でエラーなら''を返すラッパー関数
+        arranged_tda = self.arrange_columns(*(grouping_col_idxs+target_col_idxs))
+        new_tda = TwoDimArray([*arranged_tda.data[0:row_start_idx],
+                               *[list(key)+[_str2int_or_float(func(args)) for args in zip(*value)] for key, value in group_dict.items()],
+                               *([] if row_end_idx is None else arranged_tda.data[row_end_idx:])])
+
+        new_tda._copy_property(self)
+        return new_tda
+
+    def _groupby_target_col_idxs(self, grouping_col_idxs, target_col_idxs):
+        """
+        groupbyの集計対象の列(target_col_idxs)をtupleにして返す(Noneならgrouping_col_idxs以外の全ての列)
+        """
         if target_col_idxs is None: #grouping_col_idxs以外のインデックス全部
             col_set = {*range(self.shape()[1])}
             group_set = {*grouping_col_idxs}
@@ -1600,40 +3104,144 @@ class TwoDimArray(object):
                 target_col_idxs = group_set - col_set
         elif not hasattr(target_col_idxs, '__iter__'): #指定インデックスが1つのみの場合
             target_col_idxs = (target_col_idxs,)
+        return tuple(target_col_idxs)
+
+    def _groupby_aggs(self, grouping_col_idxs, aggs, row_start_idx, row_end_idx, workers=None):
+        """
+        aggsの各集計でグループを集計したTwoDimArrayインスタンスを返す(groupby(aggs=...)の処理)
+            グループごとに_Accumulatorを持ち、行を1つずつ畳み込む(_aggregate_groups参照)
+            ブロック(_row_blocks)毎に畳み込んでからブロックの順に統合する(_merge_groups参照)
+            load(lazy=True)の行はブロック毎にファイルから読んで集計する(_map_lazy_blocks参照)
+            ヘッダー行の集計列は'集計名(ヘッダーの値)'になる
+        """
+        header = None if self.header_idx is None else self._get_row(self.header_idx)
+        col_idxs = []
+        names_lst = []
+        funcs_lst = []
+        for col, funcs in aggs.items():
+            if isinstance(funcs, str) or callable(funcs): #集計が1つのみの場合
+                funcs = (funcs,)
+            col_idxs.append(_header_value2idx(header, col))
+            names_lst.append([func if isinstance(func, str) else func.__name__ for func in funcs])
+            funcs_lst.append([_groupby_agg2func(func) for func in funcs])
+        keep_nums = [any(func not in _ACCUMULATOR_FUNCS for func in funcs) for funcs in funcs_lst] #数字のリストが必要な列
+
+        delimiter = self.multiple_lines_delimiter if self.multiple_lines else None
+        row_idxs = range(self._row_len())[row_start_idx:row_end_idx]
+        if self._is_lazy() and min(grouping_col_idxs + tuple(col_idxs)) >= 0:
+            reduce = functools.partial(_aggregate_rows, grouping_col_idxs, col_idxs, keep_nums, delimiter)
+            partials = _map_lazy_blocks(self._data, row_idxs, reduce, workers)
+            key2values = tuple
+        else:
+            key_columns, key2values = self._group_key_columns(grouping_col_idxs, row_start_idx, row_end_idx)
+            keys = zip(*key_columns)
+            if col_idxs:
+                fields_rows = zip(*[self.get_column(col_idx)[row_start_idx:row_end_idx] for col_idx in col_idxs])
+            else:
+                fields_rows = repeat(())
+            partials = (_aggregate_groups(islice(keys, stop-start), islice(fields_rows, stop-start), keep_nums, delimiter)
+                        for start, stop in _row_blocks(row_idxs))
+        groups = _merge_groups(partials)
+
+        group_rows = [[*key2values(key), *[_describe_value(func, nums or [], acc) for (acc, nums), funcs in zip(group, funcs_lst) for func in funcs]]
+                      for key, group in groups.items()]
+
+        #範囲外の行(ヘッダーなど)はフィールド値をそのまま並べる
+        row_idxs = range(self._row_len())
+        header_row_idx = row_idxs[self.header_idx] if self.header_idx is not None and -len(row_idxs) <= self.header_idx < len(row_idxs) else None
+        def other_row(row_idx):
+            row = self._get_row(row_idx)
+            get_field = lambda col_idx: row[col_idx] if -len(row) <= col_idx < len(row) else ''
+            if row_idx == header_row_idx:
+                agg_fields = [f'{name}({get_field(col_idx)})' for col_idx, names in zip(col_idxs, names_lst) for name in names]
+            else:
+                agg_fields = [get_field(col_idx) for col_idx, names in zip(col_idxs, names_lst) for name in names]
+            return [*map(get_field, grouping_col_idxs), *agg_fields]
 
-        #tupleに統一
-        grouping_col_idxs = tuple(grouping_col_idxs)
-        target_col_idxs = tuple(target_col_idxs)
-        #print(f'grouping_col_idxs: {grouping_col_idxs}') ###
-        #print(f'target_col_idxs: {target_col_idxs}') ###
+        new_tda = TwoDimArray([*map(other_row, row_idxs[:row_start_idx]),
+                               *group_rows,
+                               *([] if row_end_idx is None else map(other_row, row_idxs[row_end_idx:]))])
+        new_tda._copy_property(self)
+        return new_tda
+
+    def _group_key_columns(self, grouping_col_idxs, row_start_idx, row_end_idx):
+        """
+        行範囲[row_start_idx:row_end_idx]のグループのキーの列のリストと、キーをgrouping_col_idxsの値のタプルに戻す関数を返す
+            grouping_col_idxsが全て_CategoryColumnならばコードの列を返す(キーはコードのタプルになる)
+        """
+        code_columns = self._get_code_columns(grouping_col_idxs)
+        if code_columns is None:
+            return [self.get_column(col_idx)[row_start_idx:row_end_idx] for col_idx in grouping_col_idxs], tuple
 
+        categories_lst = [column.categories for column in code_columns]
+        return ([column.codes[row_start_idx:row_end_idx] for column in code_columns],
+                lambda key: tuple(categories[code] for categories, code in zip(categories_lst, key)))
+
+    def _group_rows(self, grouping_col_idxs, target_col_idxs, row_start_idx, row_end_idx):
+        """
+        行範囲[row_start_idx:row_end_idx]の各行をグループ化した辞書{grouping_col_idxsの値のタプル: [target_col_idxsの値のタプル, ...]}を返す(groupbyの処理)
+            grouping_col_idxsが全て_CategoryColumnならばコードのタプルでグループ化してから値に戻す
+        """
         group_dict = defaultdict(list)
+        code_columns = self._get_code_columns(grouping_col_idxs)
+        use_codes = code_columns is not None and not (self.multiple_lines and any(self.multiple_lines_delimiter in value
+                                                                                  for column in code_columns for value in column.categories))
+        if use_codes:
+            key_columns, key2values = self._group_key_columns(grouping_col_idxs, row_start_idx, row_end_idx)
+            values = zip(*[self.get_column(col_idx)[row_start_idx:row_end_idx] for col_idx in target_col_idxs]) if target_col_idxs else None
+            for key in zip(*key_columns):
+                group_dict[key].append(next(values) if values is not None else ())
+
+            return {key2values(key): value for key, value in group_dict.items()}
+
         add_group_dict = lambda key, value: group_dict[key].append(value)
         group_len = len(grouping_col_idxs)
         self.cal_columns(grouping_col_idxs+target_col_idxs,
                          lambda *args: add_group_dict(args[:group_len], args[group_len:]),
                          row_start_idx=row_start_idx, row_end_idx=row_end_idx)
-        #print(group_dict) ###
+        return group_dict
 
-        func = Wrapper.non_error(func) #func処理でエラーなら''を返すラッパー関数
-        arranged_tda = self.arrange_columns(*(grouping_col_idxs+target_col_idxs))
-        new_tda = TwoDimArray([*arranged_tda.data[0:row_start_idx],
-                               *[list(key)+[_str2int_or_float(func(args)) for args in zip(*value)] for key, value in group_dict.items()],
-                               *([] if row_end_idx is None else arranged_tda.data[row_end_idx:])])
+    def _get_code_columns(self, col_idxs):
+        """
+        col_idxsの列が全て_CategoryColumnならばそのリストを返す(そうでなければNoneを返す)
+        """
+        if self._columns is None:
+            return None
 
-        new_tda._copy_property(self)
-        return new_tda
+        try:
+            columns = [self._columns[col_idx] for col_idx in col_idxs]
+        except (IndexError, TypeError):
+            return None
+        if all(isinstance(column, _CategoryColumn) for column in columns):
+            return columns
+        return None
 
     @set_row_range
-    def cross_count(self, col_idx1, col_idx2, row_start_idx=0, row_end_idx=None, field_fmt='{count} ({percent}%)'):
+    def cross_count(self, col_idx1, col_idx2, row_start_idx=0, row_end_idx=None, field_fmt='{count} ({percent}%)', workers=None):
         """
         選択した2列(col_idx1, col_idx2)をクロス集計したTwoDimArrayインスタンスを返す
         集計内容はカウント数とパーセント値、表示形式はfield_fmtで設定できる
             col_idx1: クロス集計するTwoDimArrayの行(header)となる
             col_idx2: クロス集計するTwoDimArrayの列(左端列)となる
-        """
-        target_tda = self.arrange_columns(col_idx1, col_idx2)
-        counter = Counter([tuple(row) for row in target_tda.data[row_start_idx:row_end_idx]])
+            workers: 指定するとload(lazy=True)で読み込んだ表のブロックをworkers個のプロセスで数え、各プロセスはフィールドの組のCounterだけを返す
+                     (groupbyのworkersと同じ、結果はworkers=Noneと同じ)
+        """
+        if workers is not None and workers < 1:
+            raise ValueError(f'workersは1以上を指定してください: {repr(workers)}')
+
+        code_columns = self._get_code_columns((col_idx1, col_idx2))
+        if code_columns is not None: #コードの組で数えてから値に戻す
+            column1, column2 = code_columns
+            code_counter = Counter(zip(column1.codes[row_start_idx:row_end_idx], column2.codes[row_start_idx:row_end_idx]))
+            counter = Counter({(column1.categories[code1], column2.categories[code2]): count for (code1, code2), count in code_counter.items()})
+        elif self._is_lazy() and min(col_idx1, col_idx2) >= 0: #ブロック毎にファイルから読んで数え、ブロックの順に統合する
+            counter = Counter()
+            row_idxs = range(self._row_len())[row_start_idx:row_end_idx]
+            for partial in _map_lazy_blocks(self._data, row_idxs, functools.partial(_count_pairs, col_idx1, col_idx2), workers):
+                counter.update(partial)
+        else:
+            target_tda = self.arrange_columns(col_idx1, col_idx2)
+            counter = Counter([tuple(row) for row in target_tda.data[row_start_idx:row_end_idx]])
         total_num = sum(counter.values())
 
         rows, cols = zip(*counter.keys())
@@ -1652,24 +3260,36 @@ class TwoDimArray(object):
         return new_tda
 
     @set_row_range
-    def describe(self, func_lst=(len, max, min, sum, mean, median, variance, stdev), row_start_idx=0, row_end_idx=None):
+    def describe(self, func_lst=(len, max, min, sum, mean, median, variance, stdev), row_start_idx=0, row_end_idx=None, median_sample=None):
         """
         func_lstに設定した各集計関数で各列を集計したTwoDimArrayインスタンスを返す
             集計関数には列データの内、数字のデータのみが渡る
+            len, max, min, sum, mean, variance, stdevは各列を1パスでまとめて集計する(_Accumulator参照)
+            median_sample: Noneならばmedianは全データから正確に求める
+                           指定するとランダムに取り出したmedian_sample個のデータからmedianの近似値を求める
         """
         if self.header_idx is None:
             header = []
         else:
-            header = [[''] + self.data[self.header_idx]]
-
-        new_tda = TwoDimArray(header + [[func.__name__] + self.map_columns(Wrapper.arg_of_numlist(func)) for func in func_lst])
+            header = [[''] + self._get_row(self.header_idx)]
+
+        delimiter = self.multiple_lines_delimiter if self.multiple_lines else None
+        results = [[func.__name__] for func in func_lst]
+        for column in self._range_columns(row_start_idx, row_end_idx):
+            nums = _column2numbers(column, delimiter)
+            acc = _Accumulator()
+            acc.extend(nums)
+            for result, func in zip(results, func_lst):
+                result.append(_describe_value(func, nums, acc, median_sample))
+
+        new_tda = TwoDimArray(header + results)
         new_tda._copy_property(self)
         return new_tda
 
     #------------------------------
     # 枠
     #------------------------------
-    def wrap_border(self, border_pattern=None, header_aligns=None, aligns=None, widths=None):
+    def wrap_border(self, border_pattern=None, header_aligns=None, aligns=None, widths=None, _window_rows=(0, 0)):
         """
         self.dataを枠で囲んだTwoDimArrayインスタンスを返す
             ・border_pattern: 枠パターン(border_patternsの中から選択)
@@ -1679,6 +3299,9 @@ class TwoDimArray(object):
                 ・aligns: 各列のalignを設定する辞書{列インデックス: align} (align: 左詰め='<'、右詰め='>', 中央寄せ='^')
                 ・widths: 各列のwidthを設定する辞書{列インデックス: width}
             ※列インデックスで指定されていない他の全ての設定をNoneキーで設定できる
+
+            _window_rows: selfが表の行の窓の場合に、窓の上と下の切り出さなかった行数(上の行数, 下の行数) (_wrap_window参照)
+                          枠の行は表全体と同じ枠パターンの行を使う(窓の端の枠のグループ化はしない)
         """
         #枠パターン取得
         if border_pattern is None:
@@ -1688,149 +3311,306 @@ class TwoDimArray(object):
 
         if p is None:
             return
-        p_tda = TwoDimArray([[char for char in row] for row in p.strip('\n').split('\n')]) #枠パターンを参照するTwoDimArray
-        p_tda._display_delimiter = '' #枠の表示が崩れないように表示用デリミタを空にする(デバッグ用)
-        #p_tda.print() ###
 
         #TwoDimArrayをコピー & データに穴があれば埋める
-        columns = row2column(self.data)
+        columns = self._get_columns()
         data = row2column(columns)
         d_tda = TwoDimArray(data)
         d_tda._copy_property(self)
-
-        #枠パターンの行数を増減(d_tdaの行が入るよう)
-        if p_tda._row_len()//2 == d_tda._row_len(): #同じ大きさ
-            pass
-        elif p_tda._row_len()//2 > d_tda._row_len(): #d_tdaが枠パターンより小さい
-            del(p_tda.data[d_tda._row_len()*2: -1])
-        else: #d_tdaが枠パターンより大きい
-            p_columns = row2column(p_tda.data)
-            row_increase = d_tda._row_len() - p_tda._row_len()//2
-            p_center = {'row': p_tda._row_center(), 'col': p_tda._col_center()} #初期値(行を増加させる前の値を確保)
-            #print(f'row_increase: {row_increase}') ###
-            for col_idx in range(p_tda._col_len()):
-                L = p_columns[col_idx][p_center['row']-1: p_center['row']+1][::-1]
-                L = L*(row_increase//2 + row_increase%2)
-                R = p_columns[col_idx][p_center['row']: p_center['row']+2][::-1]
-                R = R*(row_increase//2)
-                #print(f'row: L:{L}, R:{R}') ###
-                C = L + [p_columns[col_idx][p_center['row']]] + R
-                p_columns[col_idx] = p_columns[col_idx][:p_center['row']] + C + p_columns[col_idx][p_center['row']+1:]
-            p_tda.data = row2column(p_columns)
-        #p_tda.print() ###
-        #print(f'p_tda len 2: {p_tda._row_len()}, {p_tda._col_len()}') ###
-
-        #枠パターンの列数を増減(d_tdaの列が入るよう)
-        if p_tda._col_len()//2 == d_tda._col_len(): #同じ大きさ
-            pass
-        elif p_tda._col_len()//2 > d_tda._col_len(): #d_tdaが枠パターンより小さい
-            p_columns = row2column(p_tda.data)
-            del(p_columns[d_tda._col_len()*2: -1])
-            p_tda.data = row2column(p_columns)
-        else: #d_tdaが枠パターンより大きい
-            col_increase = d_tda._col_len() - p_tda._col_len()//2
-            p_center = {'row': p_tda._row_center(), 'col': p_tda._col_center()} #初期値(列を増加させる前の値を確保)
-            #print(f'col_increase: {col_increase}') ###
-            for row_idx in range(p_tda._row_len()):
-                L = p_tda.data[row_idx][p_center['col']-1: p_center['col']+1][::-1]
-                L = L*(col_increase//2 + col_increase%2)
-                R = p_tda.data[row_idx][p_center['col']: p_center['col']+2][::-1]
-                R = R*(col_increase//2)
-                #print(f'col: L:{L}, R:{R}') ###
-                C = L + [p_tda.data[row_idx][p_center['col']]] + R
-                p_tda.data[row_idx] = p_tda.data[row_idx][:p_center['col']] + C + p_tda.data[row_idx][p_center['col']+1:]
-        #p_tda.print() ###
-        #print(f'p_tda len 3: {p_tda._row_len()}, {p_tda._col_len()}') ###
-
-        #枠のグループ化(隣接するフィールド値が同じならば、その境界の枠をスペースにする)
-        if self.border_grouping:
-            #隣接する各フィールド値が同じ値か否かの情報生成
-            col_diff = [[field != next_field for field, next_field in zip(row[:-1], row[1:])] for row in d_tda.data]
-            row_diff = [[field != next_field for field, next_field in zip(col[:-1], col[1:])] for col in columns]
-            row_diff = row2column(row_diff)
-            #print(f'col_diff: {repr(col_diff)}') ###
-            #print(f'row_diff: {repr(row_diff)}') ###
-            #if col_diff and col_diff[0]: col_diff_tda = TwoDimArray(col_diff); print('col_diff:\n'); col_diff_tda.print() ###
-            #if row_diff and row_diff[0]: row_diff_tda = TwoDimArray(row_diff); print('row_diff:\n'); row_diff_tda.print() ###
-
-            for row_idx, row_data in enumerate(col_diff):
-                for idx, diff in enumerate(row_data):
-                    if not diff:
-                        p_tda.data[row_idx*2+1][idx*2+2] = ' '
-
-            for row_idx, row_data in enumerate(row_diff):
-                for idx, diff in enumerate(row_data):
-                    if not diff:
-                        p_tda.data[row_idx*2+2][idx*2+1] = ' '
-            #p_tda.print() ###
-
-        #multiple-lines
+        if self._string_index_enabled: #d_tdaのフィールドの位置はselfと同じなので、multiple-linesの検索にselfの文字列のインデックスを使う
+            if self._string_index is None:
+                self._string_index = self._build_string_index()
+            d_tda._string_index_enabled = True
+            d_tda._string_index = self._string_index
+
+        #multiple-lines(各行を複数行表現の行のリストに展開する)
+        rows_lines = [[row] for row in data]
         if self.multiple_lines:
-            new_d_tda, new_p_tda = d_tda._extend_multiple_lines(p_tda)
-            d_tda = d_tda if new_d_tda is None else new_d_tda
-            p_tda = p_tda if new_p_tda is None else new_p_tda
-            columns = row2column(d_tda.data)
-            #d_tda.print() ###
-            #p_tda.print() ###
+            for row_idx in set(row_idx for row_idx, col_idx in d_tda.get_string_idx_all(self.multiple_lines_delimiter)):
+                rows_lines[row_idx] = _multiple_lines_rows(data[row_idx], self.multiple_lines_delimiter)
 
         #alignとwidthを適用した文字列生成
-        #width設定
-        col_max_widths = _max_widths(columns, grouping_opt=self.grouping_opt, precision=self.precision)
-        #print(f'col_max_widths: {col_max_widths}') ###
-        if widths is not None and isinstance(widths, dict):
-            other_width = widths.get(None)
-            if other_width:
-                c_widths = defaultdict(lambda:other_width)
-            else:
-                c_widths = defaultdict(lambda:0)
-            c_widths.update(widths)
-            col_max_widths = [c_widths[col_idx] if c_widths[col_idx] > col_max_width else col_max_width
-                              for col_idx, col_max_width in enumerate(col_max_widths)] #widthsを取り込む(大きい値を採用)
-            #print(f'col_max_widths: {col_max_widths}(カスタム化)') ###
-        col_max_widths = [width if width%2 == 0 else width+1 for width in col_max_widths] #文字幅2のフィールド値や枠にも対応できるようにwidthを偶数にする
+        #widthsを取り込み(大きい値を採用)、文字幅2のフィールド値や枠にも対応できるようにwidthを偶数にする
+        lines_tda = TwoDimArray([line for lines in rows_lines for line in lines])
+        lines_tda._copy_property(self)
+        fields_str, col_max_widths = lines_tda._fields_string_format(header_aligns=header_aligns, aligns=aligns, widths=widths, _even_widths=True)
         #print(f'col_max_widths: {col_max_widths}') ###
-        widths = dict([(i, w) for i,w in enumerate(col_max_widths)])
-
-        d_tda._display_delimiter = ','
-        fields_str = d_tda._fields_string_format(header_aligns=header_aligns, aligns=aligns, widths=widths)
-        d_tda = TwoDimArray([[field for field in row] for row in fields_str]) #TwoDimArray化(alignとwidth情報を消さないように各フィールドはstripしない)
-        #d_tda.print() ###
-
-        #p_tdaにd_tdaの値を入れる
-        for row_idx, row_data in enumerate(p_tda.data):
-            for idx, p_field in enumerate(row_data):
-                if idx % 2 == 1:
-                    if row_idx % 2 == 0:
-                        col_max_width = col_max_widths[idx//2]
-                        if _is_em(p_field):
-                            p_tda.data[row_idx][idx] = p_field * (col_max_width//2) #各列の文字幅に合うように枠の数を調整
-                        else:
-                            p_tda.data[row_idx][idx] = p_field * col_max_width #各列の文字幅に合うように枠の数を調整
-                    else:
-                        p_tda.data[row_idx][idx] = d_tda.data[row_idx//2][idx//2] #p_tdaにd_tdaの値を入れる
-
+        fields_iter = iter(fields_str)
+        rows_fields = ((row, list(islice(fields_iter, len(lines)))) for row, lines in zip(data, rows_lines))
+
+        #コンパイルした枠パターン(_border_template)の各行にフィールドの文字列を入れて並べる
+        #_window_rowsを指定すると、上下に切り出さなかった行がある表全体の枠の行のうち、selfの行の部分だけを作る
+        #枠のグループ化: 隣接するフィールド値が同じならば、その境界の枠をスペースにする
+        #空白のみで構成された枠の行は作らない
+        top_rows, bottom_rows = _window_rows
+        template = _border_template(p, len(columns))
+        p_tda = TwoDimArray(list(template.iter_rows(rows_fields, col_max_widths, top_rows+len(data)+bottom_rows, start_row=top_rows,
+                                                    grouping=self.border_grouping)) or None)
         p_tda._copy_property(self)
         p_tda._display_delimiter = '' #枠の表示が崩れないように表示用デリミタを空にする
-        p_tda.trim(row=True, col=False) #空白の枠の行を削除する
         return p_tda
 
 #------------------------------
 # 公開関数
 #------------------------------
-def load(csv_file, sep=',', encoding=None):
+def load(csv_file, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None, compact=False, categorize=False, workers=None, lazy=False,
+         cache_dir=None, cache_max_bytes=1<<30, compression='infer', nrows=None):
     """
     csvファイル(csv_file)からTwoDimArrayを作成
         sep: セパレータは正規表現も指定可能
+        header_idx: ヘッダーのインデックス(指定するとheader_idxとdata_row_rangeプロパティを設定する)
+        dtypes: 列の型を指定する辞書{列: 型} (型の推定をせずに指定した型に変換する)
+                列はヘッダーの値(header_idxの指定が必要)かファイルの列インデックスで指定する
+                型はstr(変換しない), int, float, 'money'(通貨文字列をintかfloatに変換), 'auto'(型を推定して変換)、
+                もしくはフィールドの文字列を変換する関数
+                指定されていない他の全ての列の型をNoneキーで設定できる(Noneキーが無ければstrとする)
+                    load('sample.csv', header_idx=0, dtypes={'Name': str, 'Buttle Power': int, None: 'auto'})
+        usecols: 読み込む列のリスト(ヘッダーの値かファイルの列インデックスで指定する)
+                 指定した列だけを指定した順で読み込み、他の列はファイルを読みながら捨てる
+        compact: Trueならば数値の列をarray.arrayで保持してメモリ使用量を減らす(compact_columns参照)
+        categorize: Trueならば少数の文字列が繰り返される列をコードと値のリストで保持する(categorize_columns参照)
+            compactかcategorizeを指定すると、ファイルは少しずつ読み込んで列毎に追加するので全ての行のリストは作らない
+        workers: 指定するとファイルを行の境目でworkers個のバイト範囲に分け、各範囲をworkers個のプロセス(ProcessPoolExecutor)で
+                 区切り・strip()・型変換してから順に連結する(結果はworkers=Noneと同じ)
+                 ダブルクォートで囲まれたフィールド内の改行は範囲の境目にしない
+                 改行がb'\n'にならないエンコーディング(UTF-16など)や空のファイルは1つのプロセスで読み込む
+                 dtypesに関数を指定する場合はpickleできる関数(モジュールのトップレベルの関数など)にすること
+                 spawnでプロセスを起動する環境(Windows, macOS)ではif __name__ == '__main__':の中で呼び出すこと
+        lazy: Trueならばファイルをmmapで開いて各行の開始位置だけを記録し、行はアクセスされた時に区切り・型変換する
+              print(head=5)やget_field_value、arrange_rows、print_rangeなどは必要な行だけを変換する
+              groupby(aggs=...)とcross_countは全ての行を保持せずに、ファイルからブロック毎に読んで集計する(workersで複数のプロセスで集計できる)
+              全ての行が必要な操作(dataへのアクセスや列の操作など)をすると、その時に全ての行を変換して保持し、ファイルを閉じる
+              遅延読み込みしている間はファイルを開いたままにするので、ファイルを変更・削除しないこと(変更すると読み込む行が壊れる)
+              使い終わったらclose()するか、with文で使うとファイルを閉じる
+                  with load('huge.csv', header_idx=0, lazy=True) as tda:
+                      tda.print(head=5)
+              表示はlazy=Falseと同じく表示する行の窓だけを変換する(_head_tail_window参照)
+              compact, categorize, workersとは同時に指定できない
+              改行がb'\n'にならないエンコーディング(UTF-16など)や空のファイルはlazy=Falseと同じく読み込む
+        cache_dir: 指定すると読み込んで型変換した表(行か列のリスト)をcache_dirにpickleで保存し、次回からはそれを読み込む
+                   pickleは読み込む時に任意のコードを実行できるので、cache_dirには自分だけが書き込める信頼できるディレクトリを指定すること
+                   (他のユーザーと共有するディレクトリを指定しない)
+                   キャッシュはファイルのパスと読み込みの引数(sep, encoding, header_idx, dtypes, usecols, compact, categorize, compression, nrows)毎に作り、
+                   ファイルのサイズか更新日時が変わっていれば読み込み直して保存し直す
+                   dtypesの関数は名前とコードをキーにするので、関数を書き換えるとキャッシュを作り直す
+                   dtypesにラムダ式や関数内で定義した関数、functools.partialなどを指定した場合はキャッシュしない
+                   lazyとは同時に指定できない
+        cache_max_bytes: cache_dirのキャッシュファイルの合計サイズの上限
+                         超えると最後に使ってから最も時間が経ったキャッシュファイルから削除する
+        compression: 圧縮形式('gzip', 'bz2', 'xz', 圧縮していない場合はNone)
+                     'infer'ならばファイルの拡張子(.gz, .bz2, .xz)で決める
+                     圧縮したファイルは展開したファイルを作らずに、展開しながら読み込む
+                     圧縮したファイルはlazy, workersを指定しても1つのプロセスで全て読み込む(mmapできないため)
+        nrows: 読み込むデータの行数(header_idxを指定した場合はヘッダーまでの行を除いた行数)
+               nrows行を読み込んだらファイルの残りは読まない(ファイルの先頭を確認する場合など)
+               型の推定は読み込んだ行だけで行う
+               nrowsを指定するとlazy, workersは無視して先頭から読み込む
+    """
+    if cache_dir is not None:
+        if lazy:
+            raise ValueError('lazy=Trueとcache_dirは同時に指定できません')
+        return _load_cached(csv_file, cache_dir, cache_max_bytes, sep=sep, encoding=encoding, header_idx=header_idx, dtypes=dtypes,
+                            usecols=usecols, compact=compact, categorize=categorize, workers=workers, compression=compression, nrows=nrows)
+
+    #lazy, workersを無視して先頭から1つのプロセスで読み込むか
+    mmap_unavailable = _compression_of(csv_file, compression) is not None #圧縮したファイルはmmapでバイト範囲を読めない
+    head_rows_only = nrows is not None #先頭のnrows行だけを読むので、ファイル全体の行の位置を求めない
+    serial_only = mmap_unavailable or head_rows_only
+    if lazy:
+        if compact or categorize or workers is not None:
+            raise ValueError('lazy=Trueとcompact, categorize, workersは同時に指定できません')
+        tda = None if serial_only else _load_lazy(csv_file, sep=sep, encoding=encoding, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
+        if tda is not None:
+            return tda
+
+    if workers is not None and not serial_only:
+        if workers < 1:
+            raise ValueError(f'workersは1以上を指定してください: {repr(workers)}')
+        tda = _load_parallel(csv_file, sep=sep, encoding=encoding, header_idx=header_idx, dtypes=dtypes, usecols=usecols,
+                             compact=compact, categorize=categorize, workers=workers)
+        if tda is not None:
+            return tda
+
+    with _open_text(csv_file, encoding=encoding, compression=compression) as f:
+        return _file_obj2tda(f, sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols, compact=compact, categorize=categorize, nrows=nrows)
+
+def load_iter(csv_file, sep=',', encoding=None, chunk_rows=10000, header_idx=None, dtypes=None, usecols=None, compression='infer'):
+    """
+    csvファイル(csv_file)をchunk_rows行ずつ読み込み、TwoDimArrayを順に返すジェネレータ
+        ファイル全体をメモリに展開しないため、巨大なcsvファイルでも一定のメモリで処理できる
+            for tda in load_iter('huge.csv', chunk_rows=100000, header_idx=0):
+                tda.filter(...).save('out.csv', mode='a', uniform=False)
+
+        sep: セパレータは正規表現も指定可能
+        chunk_rows: 1つのTwoDimArrayに入れるデータの行数
+        header_idx: ヘッダーのインデックス
+                    指定するとファイル先頭からヘッダーまでの行を各TwoDimArrayの先頭に付加し、
+                    header_idxとdata_row_rangeプロパティを設定する
+        dtypes, usecols, compression: loadと同じ
     """
-    with open(csv_file, encoding=encoding) as f:
-        return _file_obj2tda(f, sep=sep)
+    with _open_text(csv_file, encoding=encoding, compression=compression) as f:
+        yield from _file_obj2tda_iter(f, sep=sep, chunk_rows=chunk_rows, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
 
-def csv2tda(string, sep=','):
+def tail(csv_file, n, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None, compression='infer'):
+    """
+    csvファイル(csv_file)の最後のn行(とheader_idxまでの行)だけを読み込んだTwoDimArrayを返す
+        ファイルの末尾から改行を逆に探して最後のn行の開始位置を求め、そこから後ろだけを区切り・型変換する
+        (巨大なcsvファイルでもファイル全体を読まない)
+            tail('huge.csv', 5, header_idx=0).print()
+
+        n: 読み込むデータの行数
+        sep, encoding, header_idx, dtypes, usecols, compression: loadと同じ
+        型の推定は読み込んだ行だけで行う
+        ダブルクォートで囲まれたフィールド内の改行は行の境目にしない
+        圧縮したファイルと改行がb'\n'にならないエンコーディング(UTF-16など)はファイルを先頭から読み、最後のn行だけを保持する
+    """
+    if n < 0:
+        raise ValueError(f'nは0以上を指定してください: {repr(n)}')
+
+    byte_encoding, bom = _byte_encoding(encoding)
+    if _compression_of(csv_file, compression) is not None or byte_encoding is None or os.path.getsize(csv_file) == 0:
+        with _open_text(csv_file, encoding=encoding, compression=compression) as f:
+            head, rows, convert = _read_head(f, sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
+            tda = _rows2tda(head, deque(rows, maxlen=n), convert)
+            _set_load_property(tda, f, header_idx, len(head))
+        return tda
+
+    quoting = len(sep) == 1 and not sep.isspace() and sep != '"' #_split_rowsがダブルクォートを処理するか
+    with open(csv_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        head_stop, head, header, col_idxs = _read_head_bytes(mm, sep=sep, encoding=byte_encoding, header_idx=header_idx,
+                                                             dtypes=dtypes, usecols=usecols, quoting=quoting, bom=bom)
+        start = _tail_start(mm, head_stop, n, quoting)
+        rows = _split_rows(io.StringIO(mm[start:].decode(byte_encoding), newline=None), sep=sep)
+        if col_idxs is not None:
+            rows = map(_usecols_selector(col_idxs), rows)
+        tda = _rows2tda(head, rows, _dtypes_converter(header, dtypes, col_idxs))
+        _set_load_property(tda, f, header_idx, len(head))
+    return tda
+
+def load_sample(csv_file, k, seed=None, stratify=None, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None, compression='infer'):
+    """
+    csvファイル(csv_file)を先頭から1度だけ読み、無作為に選んだk行(とheader_idxまでの行)のTwoDimArrayを返す(リザーバーサンプリング)
+        保持するのはk行だけなので、巨大なcsvファイルでも一定のメモリでdescribeやcross_countの概算ができる
+            load_sample('huge.csv', 10000, seed=0, header_idx=0).describe().print2()
+
+        k: 選ぶデータの行数(データの行数がk以下ならば全ての行)
+        seed: 乱数のシード(同じシードならば同じ行を選ぶ)
+        stratify: 指定すると列(ヘッダーの値か読み込んだ列のインデックス)の値毎にk行ずつ選ぶ(層別サンプリング)
+                  usecolsを指定した場合はusecolsで読み込む列から指定する
+        sep, encoding, header_idx, dtypes, usecols, compression: loadと同じ
+        選んだ行はファイルの順に並べる
+        型の推定は選んだ行だけで行う
+    """
+    if k < 0:
+        raise ValueError(f'kは0以上を指定してください: {repr(k)}')
+    rnd = random.Random(seed)
+
+    with _open_text(csv_file, encoding=encoding, compression=compression) as f:
+        head, rows, convert = _read_head(f, sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
+        if stratify is None:
+            samples = _reservoir_sample(enumerate(rows), k, rnd)
+        else:
+            header = head[header_idx] if header_idx is not None and len(head) > header_idx else None
+            samples = _stratified_sample(enumerate(rows), k, rnd, _header_value2idx(header, stratify))
+        samples.sort(key=itemgetter(0)) #ファイルの順
+        tda = _rows2tda(head, map(itemgetter(1), samples), convert)
+        _set_load_property(tda, f, header_idx, len(head))
+    return tda
+
+def groupby_iter(chunks, grouping_col_idxs, target_col_idxs=None, func=None, aggs=None, max_rows=1000000, partitions=64, tmp_dir=None, **kwargs):
+    """
+    csvファイル、もしくはTwoDimArrayのイテレータ(chunks)を順に読み込みながらgroupbyしたTwoDimArrayインスタンスを返す
+    全データをまとめてgroupbyした場合と同じ結果になる
+        グループ数が多くメモリに収まらないcsvファイルでも集計できる
+            g = groupby_iter('huge.csv', 0, aggs={'price': ['sum', 'mean']}, header_idx=0, chunk_rows=100000)
+
+        chunks: csvファイル(load_iterで読み込む)、もしくはTwoDimArrayのイテレータ(load_iterの戻り値など)
+                各TwoDimArrayのdata_row_rangeの行を集計し、先頭のTwoDimArrayのdata_row_rangeより前の行(ヘッダーなど)を結果の先頭に付ける
+        grouping_col_idxs, target_col_idxs, func, aggs: groupbyと同じ
+        max_rows: メモリに保持する行数の上限
+                  超えるとグループのキーのハッシュ値で行をpartitions個の一時ファイルに振り分け、一時ファイルごとにgroupbyする
+        tmp_dir: 一時ファイルを作るディレクトリ(Noneならtempfileの既定のディレクトリ)
+        kwargs: chunksがcsvファイルの場合にload_iterに渡す引数(sep, encoding, chunk_rows, header_idx, dtypes, usecols, compression)
+    """
+    if isinstance(chunks, (str, os.PathLike)):
+        chunks = load_iter(chunks, **kwargs)
+    chunks = iter(chunks)
+    first_tda = next(chunks, None)
+    if first_tda is None:
+        raise ValueError('chunksにTwoDimArrayがありません')
+
+    if not hasattr(grouping_col_idxs, '__iter__'): #指定インデックスが1つのみの場合
+        grouping_col_idxs = (grouping_col_idxs,)
+    grouping_col_idxs = tuple(grouping_col_idxs)
+    group_len = len(grouping_col_idxs)
+    if aggs is not None:
+        header = None if first_tda.header_idx is None else first_tda._get_row(first_tda.header_idx)
+        aggs = {_header_value2idx(header, col): funcs for col, funcs in aggs.items()}
+        target_col_idxs = tuple(aggs)
+        aggs = {group_len+target_idx: aggs[col_idx] for target_idx, col_idx in enumerate(target_col_idxs)} #振り分けた行での列インデックス
+    else:
+        target_col_idxs = first_tda._groupby_target_col_idxs(grouping_col_idxs, target_col_idxs)
+    col_idxs = grouping_col_idxs + target_col_idxs
+
+    #先頭のTwoDimArrayのdata_row_rangeより前の行を、振り分けた行と同じ列の並びにする
+    head_len = range(first_tda._row_len())[first_tda.data_row_range].start
+    head_rows = [[row[col_idx] if -len(row) <= col_idx < len(row) else '' for col_idx in col_idxs]
+                 for row in first_tda._get_rows(0, head_len)]
+
+    #groupby(func=...)はmultiple-linesの行を展開してからグループ化するので、振り分ける前に展開しておく
+    delimiter = first_tda.multiple_lines_delimiter if first_tda.multiple_lines and aggs is None else None
+    rows_iter = (_chunk_group_rows(tda, col_idxs, delimiter) for tda in chain((first_tda,), chunks))
+
+    def group(rows):
+        tda = TwoDimArray(head_rows + rows)
+        tda._copy_property(first_tda)
+        tda.data_row_range = slice(head_len, None)
+        return tda.groupby(range(group_len), range(group_len, len(col_idxs)), func=func, aggs=aggs)
+
+    buffer = []
+    for rows in rows_iter:
+        buffer.extend(rows)
+        if len(buffer) > max_rows:
+            break
+    else: #max_rowsに収まればそのままgroupbyする
+        return group(buffer)
+
+    with tempfile.TemporaryDirectory(prefix='csv_normal_', dir=tmp_dir) as tmp:
+        paths = [os.path.join(tmp, f'{partition_idx}.pickle') for partition_idx in range(partitions)]
+        files = [open(path, 'wb') for path in paths]
+        try:
+            row_no = _spill_rows(files, buffer, 0, group_len)
+            buffer = None
+            for rows in rows_iter:
+                row_no = _spill_rows(files, rows, row_no, group_len)
+        finally:
+            for f in files:
+                f.close()
+
+        #一時ファイルごとにgroupbyし、各グループの先頭の行番号順(全データをまとめてgroupbyした場合の順番)に並べる
+        new_tda = None
+        group_rows = []
+        for path in paths:
+            first_row_nos = {}
+            rows = []
+            for row_no, row in _load_spilled_rows(path):
+                first_row_nos.setdefault(tuple(row[:group_len]), row_no)
+                rows.append(row)
+            if rows:
+                new_tda = group(rows)
+                group_rows.extend((first_row_nos[tuple(row[:group_len])], row) for row in new_tda._get_rows(head_len, None))
+
+    group_rows.sort(key=itemgetter(0))
+    new_tda.data = new_tda._get_rows(0, head_len) + [row for _, row in group_rows]
+    return new_tda
+
+def csv2tda(string, sep=',', header_idx=None, dtypes=None, usecols=None, compact=False, categorize=False):
     """
     csvの文字列をTwoDimArrayに変換する
         sep: セパレータは正規表現も指定可能
+        header_idx, dtypes, usecols, compact, categorize: loadと同じ
     """
-    return _file_obj2tda(io.StringIO(string), sep=sep)
+    return _file_obj2tda(io.StringIO(string), sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols, compact=compact, categorize=categorize)
 
 def nd2tda(nd):
     """
@@ -1901,68 +3681,1331 @@ def chk_border():
 #------------------------------
 # 非公開関数
 #------------------------------
-def _file_obj2tda(fileObj, sep=','):
+def _get_item(lst, idx):
     """
-    ファイルオブジェクトからTwoDimArrayを読み出す
-        sep: セパレータは正規表現も指定可能
+    lst[idx]を返す(IndexErrorならばNoneを返す)
     """
-    re_sep = re.compile(sep)
-    tda_data = [[field.strip() for field in re_sep.split(row.strip())] for row in fileObj] #フィールドをsepで区切り、各フィールドをstrip()
-    tda_data = _str_field2int_or_float(tda_data) #intに変換できる文字列はintに、floatに変換できる文字列はfloatに変換
-    tda = TwoDimArray(tda_data)
-    if hasattr(fileObj, 'name'): #ファイルからデータを読み込んだ場合はファイル名が取得できる
-        tda.name = fileObj.name
-    else:
-        tda.name = ''
-    return tda
+    try:
+        return lst[idx]
+    except IndexError:
+        return None
 
-#文字幅関係------------------------------
-def _max_widths(columns, grouping_opt=False, precision=6):
+def _del_item(lst, idx):
     """
-    各列の最大文字列幅を返す
+    del(lst[idx])を行う(IndexErrorならば何もしない)
     """
-    columns = _field2str(columns, grouping_opt, precision)
-    return [max([_width(field) for field in col]) for col in columns]
+    try:
+        del(lst[idx])
+    except IndexError:
+        pass
 
-def _width(string):
+def _idx2range(idx, length):
     """
-    全角文字の文字幅を2として文字列幅を算出する
+    インデックス(None、0以上のint、0以上のstartを指定したステップ無しのslice)が指す範囲をrange(0, length)の中で返す
+        それ以外のインデックス(負のインデックスなど)はNoneを返す
+    """
+    if idx is None:
+        return range(length)
+    elif isinstance(idx, int) and idx >= 0:
+        return range(min(idx, length), min(idx+1, length))
+    elif (isinstance(idx, slice) and isinstance(idx.start, int) and idx.start >= 0 and idx.step is None
+          and (idx.stop is None or isinstance(idx.stop, int) and idx.stop >= 0)):
+        return range(length)[idx]
+    return None
+
+def _add_grams(grams, shorts, cell_id, field):
+    """
+    フィールド(field)の文字列のtrigramをインデックス(grams, shorts)に追加する
+    """
+    text = field if isinstance(field, str) else str(field)
+    if len(text) >= 3:
+        for gram in {text[i:i+3] for i in range(len(text)-2)}:
+            grams[gram].add(cell_id)
+    elif text:
+        shorts.add(cell_id)
+
+def _discard_grams(grams, shorts, cell_id, field):
     """
-    return sum([2 if _is_em(char) else 1 for char in string])
+    フィールド(field)の文字列のtrigramをインデックス(grams, shorts)から削除する
+    """
+    text = field if isinstance(field, str) else str(field)
+    if len(text) >= 3:
+        for gram in {text[i:i+3] for i in range(len(text)-2)}:
+            cell_ids = grams[gram]
+            cell_ids.discard(cell_id)
+            if not cell_ids:
+                del grams[gram]
+    else:
+        shorts.discard(cell_id)
 
-def _count_em(string):
+def _required_literal(pattern):
     """
-    全角文字の文字数を返す
+    正規表現(pattern)にマッチする文字列が必ず含む文字列(最も長いもの)を返す
+        patternの先頭レベルで連続するリテラルを探す
+        フラグが指定されている、またはリテラルが無い場合はNoneを返す
     """
-    return sum([1 for char in string if _is_em(char)])
+    if isinstance(pattern, re.Pattern):
+        if pattern.flags & ~re.UNICODE:
+            return None
+        pattern = pattern.pattern
+    if not isinstance(pattern, str):
+        return None
 
-en_table = [
-'═', '║', '╔','╗', '╚', '╝', '╠', '╣', '╦', '╩', '╬', #Double
-'·', '╭', '╮', '╯', '╰', #Rcorner
-'♠', '♥', '♦', '♣', '♤', '♡', '♢', '♧', #Suit
-]
+    try:
+        parsed = _re_parser.parse(pattern)
+    except re.error:
+        return None
+    if parsed.state.flags & ~re.UNICODE:
+        return None
+
+    literals = ['']
+    for op, av in parsed:
+        if op is _re_parser.LITERAL:
+            literals[-1] += chr(av)
+        else:
+            literals.append('')
 
-def _is_em(char):
+    return max(literals, key=len) or None
+
+def _column2numbers(column, multiple_lines_delimiter=None):
     """
-    全角文字ならTrueを返す
+    列(column)から数字のフィールドだけを取り出したリストを返す(describeの処理)
+        multiple_lines_delimiterを指定するとmultiple-linesのフィールドを展開してから取り出す
+        (map_columnsでWrapper._arg_of_flatten_multiplelines_listとWrapper.arg_of_numlistを使った場合と同じ)
     """
-    #------------------------------------------------------------
-    #文字判定: F: Fullwidth(全角) - 全角英数字
-    #          W: Wide(広) - 漢字や仮名文字など
-    #          A: Ambiguous(曖昧) - 記号など(全角/半角が交じっている)
-    #
-    # ※使いたい枠(罫線)がAグループなのでAも全角文字として扱う
-    #   このためAグループの半角文字を使用した場合は誤判定して
-    #   位置ズレの原因となるため注意すること
-    #   (Aグループでもen_tableに登録した文字は半角として判定する)
-    #------------------------------------------------------------
-    data = unicodedata.east_asian_width(char)
-    if data in ('F', 'W'):
-        return True
-    elif data in ('A',) and char not in en_table:
-        return True
+    if multiple_lines_delimiter is not None and any(multiple_lines_delimiter in field for field in column if isinstance(field, str)):
+        fields = []
+        for field in column:
+            if isinstance(field, str) and multiple_lines_delimiter in field:
+                fields.extend(field.split(multiple_lines_delimiter))
+            else:
+                fields.append(field)
+        column = map(_str2int_or_float, fields)
 
-    return False
+    return [field for field in column if isinstance(field, int) or isinstance(field, float)]
+
+def _describe_value(func, nums, acc, median_sample=None):
+    """
+    数字のリスト(nums)をfuncで集計した値を返す(describeの処理)
+        _ACCUMULATOR_FUNCSの集計関数は_Accumulator(acc)の集計結果を使う
+        median_sampleを指定するとmedianはランダムに取り出したmedian_sample個の数字から求める
+        エラーになる場合は空文字('')を返す
+    """
+    try:
+        if func is median and median_sample is not None and len(nums) > median_sample:
+            return median(random.Random(0).sample(nums, median_sample)) #再現性のためシードは固定
+        if func in _ACCUMULATOR_FUNCS:
+            return _ACCUMULATOR_FUNCS[func](acc)
+        return func(nums)
+    except:
+        return ''
+
+def _chunk_group_rows(tda, col_idxs, multiple_lines_delimiter=None):
+    """
+    TwoDimArray(tda)のdata_row_rangeの各行からcol_idxsのフィールドを取り出した行のリストを返す(groupby_iterの処理)
+        multiple_lines_delimiterを指定すると、全てのフィールドがmultiple-linesの行は1行ずつに展開する
+    """
+    row_range = range(tda._row_len())[tda.data_row_range]
+    rows = row2column([tda.get_column(col_idx)[row_range.start:row_range.stop] for col_idx in col_idxs])
+    if multiple_lines_delimiter is None:
+        return rows
+    return [list(fields) for row in rows for fields in _expand_multiple_lines(row, multiple_lines_delimiter)]
+
+def _expand_multiple_lines(fields, multiple_lines_delimiter):
+    """
+    全てのフィールドがmultiple-linesならば1行ずつに展開したフィールドのタプルのリスト、そうでなければ[fields]を返す
+        (cal_columnsでWrapper.support_multiplelinesを使った場合と同じ展開)
+    """
+    if all(isinstance(field, str) and multiple_lines_delimiter in field for field in fields):
+        return list(zip(*[[_str2int_or_float(line) for line in field.split(multiple_lines_delimiter)] for field in fields]))
+    return [fields]
+
+def _reservoir_sample(items, k, rnd):
+    """
+    itemsから無作為に選んだk個のリストを返す(load_sampleの処理)
+        Algorithm L: 次に入れ替える要素までの個数を乱数で求めて読み飛ばすので、要素毎に乱数を作らない
+    """
+    items = iter(items)
+    reservoir = list(islice(items, k))
+    if len(reservoir) < k or k == 0:
+        return reservoir
+
+    def uniform(): #(0, 1]の乱数
+        return 1.0 - rnd.random()
+
+    w = math.exp(math.log(uniform())/k)
+    while True:
+        skip = int(math.log(uniform()) / math.log1p(-w)) if w < 1 else 0
+        item = next(islice(items, skip, None), None)
+        if item is None:
+            return reservoir
+        reservoir[rnd.randrange(k)] = item
+        w *= math.exp(math.log(uniform())/k)
+
+def _stratified_sample(items, k, rnd, col_idx):
+    """
+    (行番号, 行)のitemsから行のcol_idx列の値毎に無作為に選んだk個ずつのリストを返す(load_sample(stratify=...)の処理)
+        Algorithm R: 値毎にそれまでの個数を数え、k個を超えたらk/個数の確率で入れ替える
+    """
+    reservoirs = defaultdict(list)
+    counts = Counter()
+    for item in items:
+        row = item[1]
+        value = row[col_idx] if -len(row) <= col_idx < len(row) else ''
+        counts[value] += 1
+        reservoir = reservoirs[value]
+        if len(reservoir) < k:
+            reservoir.append(item)
+        else:
+            idx = rnd.randrange(counts[value])
+            if idx < k:
+                reservoir[idx] = item
+    return list(chain.from_iterable(reservoirs.values()))
+
+def _spill_rows(files, rows, row_no, group_len):
+    """
+    行(rows)を先頭group_len個のフィールドのハッシュ値で一時ファイル(files)に振り分けて書き込み、次の行番号を返す(groupby_iterの処理)
+        各行は(行番号, 行)として書き込む
+    """
+    batches = defaultdict(list)
+    for row in rows:
+        batches[hash(tuple(row[:group_len])) % len(files)].append((row_no, row))
+        row_no += 1
+    for partition_idx, batch in batches.items():
+        pickle.dump(batch, files[partition_idx], pickle.HIGHEST_PROTOCOL)
+    return row_no
+
+def _load_spilled_rows(path):
+    """
+    _spill_rowsで一時ファイル(path)に書き込んだ(行番号, 行)を順に返すジェネレータ
+    """
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                batch = pickle.load(f)
+            except EOFError:
+                return
+            yield from batch
+
+def _aggregate_groups(keys, fields_rows, keep_nums, multiple_lines_delimiter=None):
+    """
+    各行のキー(keys)ごとに、各行のフィールド(fields_rows)の数字を_Accumulatorに畳み込んだ辞書を返す(groupby(aggs=...)の処理)
+        辞書は{キー: [(_Accumulator, 数字のリスト or None), ...]}で、keep_numsがTrueの列だけ数字のリストを保持する
+        multiple_lines_delimiterを指定するとmultiple-linesのフィールドは展開する
+    """
+    groups = {}
+    for key, fields in zip(keys, fields_rows):
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = [(_Accumulator(), [] if keep else None) for keep in keep_nums]
+        for (acc, nums), field in zip(group, fields):
+            if isinstance(field, int) or isinstance(field, float):
+                acc.add(field)
+                if nums is not None:
+                    nums.append(field)
+            elif multiple_lines_delimiter is not None and isinstance(field, str) and multiple_lines_delimiter in field:
+                field_nums = _column2numbers((field,), multiple_lines_delimiter)
+                acc.extend(field_nums)
+                if nums is not None:
+                    nums.extend(field_nums)
+    return groups
+
+def _aggregate_rows(grouping_col_idxs, col_idxs, keep_nums, multiple_lines_delimiter, rows):
+    """
+    行(rows)をgrouping_col_idxsの値のタプルごとに、col_idxsのフィールドの数字を_Accumulatorに畳み込んだ辞書を返す(_aggregate_groups参照)
+    (groupby(aggs=...)でload(lazy=True)の行のブロックを集計する処理)
+        行に無い列は空('')とする(get_columnと同じ)
+    """
+    rows = list(rows)
+    keys = map(tuple, map(_usecols_selector(grouping_col_idxs), rows))
+    return _aggregate_groups(keys, map(_usecols_selector(col_idxs), rows), keep_nums, multiple_lines_delimiter)
+
+def _count_pairs(col_idx1, col_idx2, rows):
+    """
+    行(rows)のcol_idx1とcol_idx2のフィールドの組を数えたCounterを返す(cross_countでload(lazy=True)の行のブロックを集計する処理)
+        行に無い列は空('')とする(arrange_columnsと同じ)
+    """
+    return Counter(map(tuple, map(_usecols_selector((col_idx1, col_idx2)), rows)))
+
+def _merge_groups(partials):
+    """
+    ブロック毎に_aggregate_groupsで集計した辞書(partials)を順に統合した辞書を返す(groupby(aggs=...)の処理)
+        _Accumulatorはmergeで統合し、数字のリストはブロックの順に連結する
+        グループの順(最初に現れた順)とキーの値は、全ての行を1つの辞書に集計した場合と同じになる
+    """
+    groups = {}
+    for partial in partials:
+        for key, group in partial.items():
+            merged = groups.get(key)
+            if merged is None:
+                groups[key] = group
+                continue
+            for (acc, nums), (part_acc, part_nums) in zip(merged, group):
+                acc.merge(part_acc)
+                if nums is not None:
+                    nums.extend(part_nums)
+    return groups
+
+#groupby(aggs=...), cross_countで1度に集計する行数(プロセスに渡す1つのバイト範囲の行数)
+_GROUPBY_BLOCK_ROWS = 100000
+
+def _row_blocks(row_idxs, block_rows=_GROUPBY_BLOCK_ROWS):
+    """
+    行範囲(row_idxs)を行インデックスがblock_rowsの倍数の位置で区切った(開始, 終了)を順に返すジェネレータ
+        区切る位置はworkersの数によらないので、ブロック毎に集計して統合した結果(floatの合計など)はworkersの数によらない
+    """
+    start = row_idxs.start
+    while start < row_idxs.stop:
+        stop = min((start // block_rows + 1) * block_rows, row_idxs.stop)
+        yield start, stop
+        start = stop
+
+#groupby(aggs=...)の集計名と集計関数
+_GROUPBY_AGGS = {
+    'count': len,
+    'sum': sum,
+    'mean': mean,
+    'min': min,
+    'max': max,
+    'median': median,
+    'variance': variance,
+    'stdev': stdev,
+}
+
+def _groupby_agg2func(agg):
+    """
+    groupby(aggs=...)の集計(集計名か集計関数)を集計関数にする
+    """
+    if callable(agg):
+        return agg
+    try:
+        return _GROUPBY_AGGS[agg]
+    except (KeyError, TypeError):
+        raise ValueError(f'集計名は{list(_GROUPBY_AGGS)}か集計関数を指定してください: {repr(agg)}') from None
+
+def _fraction2number(fraction):
+    """
+    分数(Fraction)を整数ならばint、そうでなければfloatにする(statisticsの集計結果と同じ型にする)
+    """
+    if fraction.denominator == 1:
+        return int(fraction)
+    return float(fraction)
+
+def _sqrt_of_fraction(fraction):
+    """
+    分数(Fraction)の平方根を正しく丸めたfloatを返す
+        floatの仮数部(53bit)より十分大きい109bitの整数で平方根を求め、端数があれば最下位bitを立ててから(round-to-odd)floatに変換する
+    """
+    n, m = fraction.numerator, fraction.denominator
+    shift = (n.bit_length() - m.bit_length() - 109) // 2
+    if shift >= 0:
+        n, m = n, m << 2*shift
+    else:
+        n, m = n << -2*shift, m
+    root = math.isqrt(n // m)
+    root |= root*root*m != n #round-to-odd
+    return math.ldexp(root, shift) if shift >= 0 else root / (1 << -shift)
+
+def _is_hashable(value):
+    """
+    valueが辞書のキーにできればTrueを返す
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+#ビット列(bytearray)------------------------------
+def _get_bit(bitmap, idx):
+    """
+    ビット列(bitmap)のidx番目のビットが立っていればTrueを返す
+    """
+    byte_idx = idx >> 3
+    return byte_idx < len(bitmap) and bool(bitmap[byte_idx] >> (idx & 7) & 1)
+
+def _set_bits(bitmap, idxs):
+    """
+    ビット列(bitmap)のidxs番目のビットを立てる(足りない分はbitmapを伸ばす)
+    """
+    for idx in idxs:
+        byte_idx = idx >> 3
+        if byte_idx >= len(bitmap):
+            bitmap.extend(bytes(byte_idx - len(bitmap) + 1))
+        bitmap[byte_idx] |= 1 << (idx & 7)
+
+def _set_bit_range(bitmap, start, stop):
+    """
+    ビット列(bitmap)の[start:stop]番目のビットを全て立てる
+    """
+    head_stop = min(stop, (start + 7) & ~7) #バイトの途中から始まる部分
+    tail_start = max(head_stop, stop & ~7) #バイトの途中で終わる部分
+    _set_bits(bitmap, range(start, head_stop))
+    if head_stop < tail_start:
+        byte_start, byte_stop = head_stop >> 3, tail_start >> 3
+        if byte_stop > len(bitmap):
+            bitmap.extend(bytes(byte_stop - len(bitmap)))
+        bitmap[byte_start:byte_stop] = b'\xff' * (byte_stop - byte_start)
+    _set_bits(bitmap, range(tail_start, stop))
+
+def _iter_bits(bitmap, start, stop):
+    """
+    ビット列(bitmap)の[start:stop]番目で立っているビットのインデックスを順に返すジェネレータ
+        0のバイトは正規表現でまとめて読み飛ばす
+    """
+    for match in _NONZERO_BYTE.finditer(bitmap, start >> 3, (stop + 7) >> 3):
+        byte_idx = match.start()
+        byte = bitmap[byte_idx]
+        for bit in range(8):
+            if byte >> bit & 1:
+                idx = byte_idx << 3 | bit
+                if start <= idx < stop:
+                    yield idx
+
+_NONZERO_BYTE = re.compile(rb'[^\x00]')
+
+def _file_obj2tda(fileObj, sep=',', header_idx=None, dtypes=None, usecols=None, compact=False, categorize=False, nrows=None):
+    """
+    ファイルオブジェクトからTwoDimArrayを読み出す
+        sep: セパレータは正規表現も指定可能
+        header_idx, dtypes, usecols, compact, categorize, nrows: loadと同じ
+    """
+    head, rows, convert = _read_head(fileObj, sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
+    if nrows is not None:
+        rows = islice(rows, nrows) #nrows行より後はファイルから読まない
+    tda = _rows2tda(head, rows, convert, compact=compact, categorize=categorize)
+    _set_load_property(tda, fileObj, header_idx, len(head))
+    return tda
+
+def _rows2tda(head, rows, convert, compact=False, categorize=False):
+    """
+    ヘッダーまでの行(head)と残りの行(rows)をconvertで変換してTwoDimArrayを作成する(_file_obj2tdaと_load_parallelの共通処理)
+        compact, categorize: loadと同じ
+    """
+    column_classes = (_ArrayColumn,)*bool(compact) + (_CategoryColumn,)*bool(categorize)
+    if column_classes:
+        tda = TwoDimArray()
+        tda.column_major = True
+        columns = _read_compact_columns(head, rows, convert, column_classes)
+        if columns and len(columns[0]):
+            tda._set_columns(columns)
+    else:
+        tda_data = convert(list(rows)) #intに変換できる文字列はintに、floatに変換できる文字列はfloatに変換
+        tda = TwoDimArray(head + tda_data) if head or tda_data else TwoDimArray() #行が無ければ空のTwoDimArray(nrows=0など)
+    return tda
+
+def _load_parallel(csv_file, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None, compact=False, categorize=False, workers=1):
+    """
+    csvファイル(csv_file)を行の境目でworkers個のバイト範囲に分け、各範囲をプロセスで並列に読み込んだTwoDimArrayを返す(load(workers=...)の処理)
+        ヘッダーまでの行はこのプロセスで読み込み、usecolsとdtypesの列の指定をヘッダーの値で解決してから各プロセスに渡す
+        並列に読み込めない場合(改行がb'\n'にならないエンコーディング、空のファイル)はNoneを返す
+        utf-8-sigは先頭の範囲でBOMを読み飛ばし、各範囲を'utf-8'でデコードする
+    """
+    encoding, bom = _byte_encoding(encoding)
+    if encoding is None:
+        return None
+    quoting = len(sep) == 1 and not sep.isspace() and sep != '"' #_split_rowsがダブルクォートを処理するか
+
+    with open(csv_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            head_stop, head, header, col_idxs = _read_head_bytes(mm, sep=sep, encoding=encoding, header_idx=header_idx,
+                                                                 dtypes=dtypes, usecols=usecols, quoting=quoting, bom=bom)
+            bounds = _split_byte_ranges(mm, head_stop, workers, quoting)
+
+        read_range = functools.partial(_load_byte_range, csv_file, sep=sep, encoding=encoding, header=header, dtypes=dtypes, col_idxs=col_idxs)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            blocks = executor.map(read_range, bounds[:-1], bounds[1:])
+            tda = _rows2tda(head, chain.from_iterable(blocks), lambda rows: rows, compact=compact, categorize=categorize)
+        _set_load_property(tda, f, header_idx, len(head))
+    return tda
+
+def _load_lazy(csv_file, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None):
+    """
+    csvファイル(csv_file)の各行をアクセスされた時に変換するTwoDimArrayを返す(load(lazy=True)の処理)
+        ヘッダーまでの行はこの時点で読み込んで変換し、残りの行は開始位置だけを記録する
+        遅延読み込みできない場合(改行がb'\n'にならないエンコーディング、空のファイル)はNoneを返す
+    """
+    encoding, bom = _byte_encoding(encoding)
+    if encoding is None:
+        return None
+    quoting = len(sep) == 1 and not sep.isspace() and sep != '"' #_split_rowsがダブルクォートを処理するか
+
+    with open(csv_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) #ファイルを閉じてもmmapは使える
+
+        head_stop, head, header, col_idxs = _read_head_bytes(mm, sep=sep, encoding=encoding, header_idx=header_idx,
+                                                             dtypes=dtypes, usecols=usecols, quoting=quoting, bom=bom)
+        offsets = array('q')
+        pos = head_stop
+        while pos < len(mm):
+            offsets.append(pos)
+            pos = _skip_records(mm, pos, 1, quoting)
+
+        tda = TwoDimArray()
+        tda.data = _LazyRows(csv_file, mm, head, offsets, sep, encoding, header, dtypes, col_idxs)
+        _set_load_property(tda, f, header_idx, len(head))
+    return tda
+
+def _load_cached(csv_file, cache_dir, cache_max_bytes=1<<30, workers=None, **kwargs):
+    """
+    cache_dirのキャッシュからcsvファイル(csv_file)のTwoDimArrayを返す(load(cache_dir=...)の処理)
+        キャッシュが無いか古ければloadで読み込んでキャッシュに保存する
+        kwargs: キャッシュのキーにするloadの引数(sep, encoding, header_idx, dtypes, usecols, compact, categorize, compression, nrows)
+    """
+    key = _load_cache_key(csv_file, **kwargs)
+    if key is None: #キャッシュのキーにできないdtypes
+        return load(csv_file, workers=workers, **kwargs)
+
+    stat = os.stat(csv_file)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cache_file = os.path.join(cache_dir, key + _LOAD_CACHE_SUFFIX)
+    tda = _read_load_cache(cache_file, stamp)
+    if tda is None:
+        tda = load(csv_file, workers=workers, **kwargs)
+        _write_load_cache(cache_file, stamp, tda)
+        _evict_load_cache(cache_dir, cache_max_bytes, cache_file)
+    tda.name = csv_file
+    return tda
+
+_LOAD_CACHE_SUFFIX = '.tdacache'
+
+def _load_cache_key(csv_file, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None, compact=False, categorize=False, compression='infer',
+                    nrows=None):
+    """
+    load(cache_dir=...)のキャッシュファイル名にするキー(ファイルのパスと読み込みの引数のハッシュ値)を返す
+        dtypesの関数は名前と、関数のコード(命令列・定数・参照する名前)のハッシュ値をキーにする(関数を書き換えればキャッシュを作り直す)
+        dtypesの関数に名前で特定できないもの(ラムダ式や関数内で定義した関数、functools.partialなど)があればNoneを返す
+    """
+    def code_digest(code):
+        digest = hashlib.sha1(code.co_code)
+        digest.update(repr(code.co_names).encode('utf8'))
+        for const in code.co_consts:
+            if inspect.iscode(const): #関数内の関数や内包表記
+                const = code_digest(const)
+            elif isinstance(const, frozenset): #reprの順番が実行毎に変わらないようにする
+                const = sorted(map(repr, const))
+            digest.update(repr(const).encode('utf8'))
+        return digest.hexdigest()
+
+    def func_key(dtype):
+        if not callable(dtype):
+            return dtype
+        name = f"{getattr(dtype, '__module__', None)}.{getattr(dtype, '__qualname__', '<unknown>')}"
+        if '<' in name:
+            return None
+        code = getattr(dtype, '__code__', None)
+        return name if code is None else (name, code_digest(code))
+
+    dtype_items = []
+    for col, dtype in (dtypes or {}).items():
+        key = func_key(dtype)
+        if key is None:
+            return None
+        dtype_items.append((repr(col), key))
+
+    encoding = encoding or locale.getpreferredencoding(False) #open()のencoding=Noneと同じ
+    params = (__version__, os.path.abspath(csv_file), sep, encoding, header_idx, sorted(dtype_items),
+              None if usecols is None else list(usecols), bool(compact), bool(categorize), _compression_of(csv_file, compression), nrows)
+    return hashlib.sha1(repr(params).encode('utf8')).hexdigest()
+
+def _read_load_cache(cache_file, stamp):
+    """
+    キャッシュファイル(cache_file)のTwoDimArrayを返す
+        キャッシュファイルが無い、csvファイルのサイズと更新日時(stamp)が保存時と違う、壊れている場合はNoneを返す
+        ※pickleを読み込むので、cache_dirは信頼できるディレクトリであること(load参照)
+    """
+    try:
+        with open(cache_file, 'rb') as f:
+            if pickle.load(f) != stamp:
+                return None
+            rows, columns, header_idx, data_row_range = pickle.load(f)
+        os.utime(cache_file) #最後に使った日時にする(cache_max_bytesを超えた時に削除する順番)
+    except Exception: #キャッシュファイルが無いか壊れていれば読み込み直して上書きする
+        return None
+
+    tda = TwoDimArray(rows)
+    if columns is not None:
+        tda.column_major = True
+        if columns and len(columns[0]):
+            tda._set_columns(columns)
+    tda.header_idx = header_idx
+    tda.data_row_range = data_row_range
+    return tda
+
+def _write_load_cache(cache_file, stamp, tda):
+    """
+    TwoDimArray(tda)をcsvファイルのサイズと更新日時(stamp)と共にキャッシュファイル(cache_file)に保存する
+        一時ファイルに書き込んでから置き換えるので、同時に読み込む他のプロセスが書きかけのファイルを読むことはない
+        保存できなくても(書き込めないcache_dir、pickleできない値)loadは失敗させない
+    """
+    if tda._columns is not None:
+        payload = (None, tda._columns, tda.header_idx, tda.data_row_range)
+    else:
+        payload = (tda._data, [] if tda.column_major else None, tda.header_idx, tda.data_row_range)
+
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(stamp, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
+    except (OSError, pickle.PicklingError, TypeError, AttributeError): #書き込めないcache_dirやpickleできない値
+        pass
+
+def _evict_load_cache(cache_dir, cache_max_bytes, keep_file=None):
+    """
+    cache_dirのキャッシュファイルの合計サイズがcache_max_bytes以下になるまで、最後に使ってから最も時間が経ったものから削除する(LRU)
+        keep_file: 削除しないキャッシュファイル(保存したばかりのもの)
+    """
+    entries = []
+    try:
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(_LOAD_CACHE_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    except OSError:
+        return
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= cache_max_bytes:
+            break
+        if path == keep_file:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError: #他のプロセスが削除した
+            pass
+        total -= size
+
+def _byte_encoding(encoding):
+    """
+    バイト範囲ごとにデコードして読み込む時(_load_parallel, _load_lazy, tail)の(エンコーディング, 先頭で読み飛ばすBOM)を返す
+        改行とダブルクォートが1バイト(b'\n', b'"')にならないエンコーディング(UTF-16など)は(None, b'')を返す
+        utf-8-sigはBOMを読み飛ばせば'utf-8'と同じなので('utf-8', codecs.BOM_UTF8)を返す
+    """
+    encoding = encoding or locale.getpreferredencoding(False) #open()のencoding=Noneと同じ
+    if codecs.lookup(encoding).name == 'utf-8-sig':
+        return 'utf-8', codecs.BOM_UTF8
+    if '\n"'.encode(encoding) != b'\n"':
+        return None, b''
+    return encoding, b''
+
+def _read_head_bytes(mm, sep=',', encoding=None, header_idx=None, dtypes=None, usecols=None, quoting=False, bom=b''):
+    """
+    バイト列(mm)の先頭からヘッダーまでの行を読み込み、(ヘッダーまでの行の終わりの位置, 変換したヘッダーまでの行, ヘッダーの行, usecolsの列インデックス)を返す
+    (_load_parallelと_load_lazyの共通処理)
+        bom: バイト列がこのBOMで始まっていれば読み飛ばす
+    """
+    start = len(bom) if bom and mm[:len(bom)] == bom else 0
+    head_stop = _skip_records(mm, start, 0 if header_idx is None else header_idx+1, quoting)
+    head_text = mm[start:head_stop].decode(encoding)
+
+    head_rows = list(_split_rows(io.StringIO(head_text, newline=None), sep=sep))
+    header = head_rows[header_idx] if header_idx is not None and len(head_rows) > header_idx else None
+    col_idxs = None if usecols is None else [_header_value2idx(header, col) for col in usecols]
+    head, _, _ = _read_head(io.StringIO(head_text, newline=None), sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
+    return head_stop, head, header, col_idxs
+
+def _skip_records(mm, start, record_num, quoting=False):
+    """
+    バイト列(mm)のstartからrecord_num行分を読み飛ばした位置を返す
+        quotingがTrueならばダブルクォートの数が奇数の間(ダブルクォートで囲まれたフィールド内の改行)は行を続ける
+    """
+    pos = start
+    for _ in range(record_num):
+        record_start = pos
+        while True:
+            newline = mm.find(b'\n', pos)
+            pos = len(mm) if newline == -1 else newline+1
+            if not quoting or pos == len(mm) or mm[record_start:pos].count(b'"') % 2 == 0:
+                break
+        if pos == len(mm):
+            break
+    return pos
+
+def _tail_start(mm, start, record_num, quoting=False):
+    """
+    バイト列(mm)の[start:]の最後のrecord_num行の開始位置を返す(末尾から改行を逆に探す)
+        quotingがTrueならば、その位置から末尾までのダブルクォートの数が奇数になる改行(ダブルクォートで囲まれたフィールド内の改行)は行の境目にしない
+    """
+    pos = len(mm)
+    if pos > start and mm[pos-1:pos] == b'\n': #最後の改行の後ろは行にしない
+        pos -= 1
+    quote_num = 0 #posから末尾までのダブルクォートの数
+    record_start = len(mm)
+    found = 0
+    while found < record_num and pos > start:
+        newline = mm.rfind(b'\n', start, pos)
+        line_start = start if newline == -1 else newline+1
+        if quoting:
+            quote_num += _count_bytes(mm, b'"', line_start, pos)
+        pos = max(start, newline)
+        if quote_num % 2 == 0:
+            record_start = line_start
+            found += 1
+    return record_start if record_num else len(mm)
+
+def _split_byte_ranges(mm, start, parts, quoting=False):
+    """
+    バイト列(mm)の[start:]を行の境目でparts個程度に分けた範囲の境目のリスト[start, ..., len(mm)]を返す
+        quotingがTrueならばダブルクォートで囲まれたフィールド内の改行は境目にしない(RFC 4180のダブルクォートを想定)
+    """
+    size = len(mm)
+    step = max(1, (size-start) // parts)
+    bounds = [start]
+    quote_num = 0 #bounds[-1]までのダブルクォートの数
+    for part_idx in range(1, parts):
+        newline = mm.find(b'\n', max(start + part_idx*step, bounds[-1]))
+        if newline == -1:
+            break
+        bound = newline+1
+        if quoting:
+            quote_num += _count_bytes(mm, b'"', bounds[-1], bound)
+            while quote_num % 2 and bound < size: #ダブルクォートで囲まれたフィールドの中なので次の改行まで進める
+                newline = mm.find(b'\n', bound)
+                next_bound = size if newline == -1 else newline+1
+                quote_num += _count_bytes(mm, b'"', bound, next_bound)
+                bound = next_bound
+        if bound >= size:
+            break
+        bounds.append(bound)
+    bounds.append(size)
+    return bounds
+
+def _count_bytes(mm, sub, start, stop, block_size=2**24):
+    """
+    バイト列(mm)の[start:stop]に含まれるsubの数を返す(block_sizeずつコピーして数える)
+        subは1バイトであること
+    """
+    return sum(mm[pos:min(pos+block_size, stop)].count(sub) for pos in range(start, stop, block_size))
+
+def _load_byte_range(csv_file, start, stop, sep=',', encoding=None, header=None, dtypes=None, col_idxs=None):
+    """
+    csvファイル(csv_file)のバイト範囲[start:stop]を区切り・strip()・型変換した行のリストを返す(load(workers=...)の各プロセスの処理)
+        header, col_idxs: ヘッダーの行とusecolsで選択した列のファイルの列インデックス(dtypesの列の指定の解決に使う)
+    """
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        text = f.read(stop-start).decode(encoding)
+
+    rows = _split_rows(io.StringIO(text, newline=None), sep=sep)
+    if col_idxs is not None:
+        rows = map(_usecols_selector(col_idxs), rows)
+    return _dtypes_converter(header, dtypes, col_idxs)(list(rows))
+
+def _map_lazy_blocks(lazy_rows, row_idxs, reduce, workers=None):
+    """
+    load(lazy=True)の行(lazy_rows)の行範囲(row_idxs)をブロック(_row_blocks)に分け、各ブロックの行をreduceで集計した結果をブロックの順に返すジェネレータ
+    (groupby(aggs=...), cross_countの処理)
+        各ブロックはファイルのバイト範囲にして渡し、ファイルを開いて区切り・型変換する(_reduce_byte_range参照)
+        workers: 指定するとworkers個のプロセス(ProcessPoolExecutor)で各ブロックを集計し、各プロセスは集計結果だけを返す
+                 ブロックはworkers*2個ずつ順に渡し、結果はブロックの順に受け取る
+    """
+    head_len = len(lazy_rows.head)
+    offsets = lazy_rows.offsets
+    size = len(lazy_rows.mm)
+
+    def byte_pos(row_idx): #行の開始位置(ヘッダーまでの行は最初の行の位置)
+        row_idx = max(row_idx, head_len) - head_len
+        return offsets[row_idx] if row_idx < len(offsets) else size
+
+    read_block = functools.partial(_reduce_byte_range, reduce, lazy_rows.path, sep=lazy_rows.sep, encoding=lazy_rows.encoding,
+                                   header=lazy_rows.header, dtypes=lazy_rows.dtypes, col_idxs=lazy_rows.col_idxs)
+    blocks = ((byte_pos(start), byte_pos(stop), lazy_rows.head[start:stop], max(start, head_len)) for start, stop in _row_blocks(row_idxs))
+    if workers is None or workers == 1:
+        yield from (read_block(*block) for block in blocks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = deque()
+        for block in blocks: #全てのブロックを一度に渡さない
+            futures.append(executor.submit(read_block, *block))
+            if len(futures) >= workers*2:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+def _reduce_byte_range(reduce, csv_file, start, stop, head_rows, row_start_idx, sep=',', encoding=None, header=None, dtypes=None, col_idxs=None):
+    """
+    ヘッダーまでの行(head_rows)と、csvファイル(csv_file)のバイト範囲[start:stop]を区切り・型変換した行をreduceで集計した結果を返す
+    (_map_lazy_blocksの各ブロックの処理)
+        row_start_idx: バイト範囲の最初の行のインデックス(ヘッダーまでの行を含めた行インデックス)
+        型変換はload(lazy=True)の行を全て変換する場合(_LazyRows.__iter__)と同じく、_COMPACT_CHUNK_ROWSの倍数の行インデックスで区切って行う
+        (型の推定を同じ行のまとまりで行うので、同じ値になる)
+    """
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        text = f.read(stop-start).decode(encoding)
+
+    rows = _split_rows(io.StringIO(text, newline=None), sep=sep)
+    if col_idxs is not None:
+        rows = map(_usecols_selector(col_idxs), rows)
+    convert = _dtypes_converter(header, dtypes, col_idxs)
+
+    def converted_rows():
+        yield from head_rows
+        chunk_rows = _COMPACT_CHUNK_ROWS - row_start_idx % _COMPACT_CHUNK_ROWS
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                return
+            yield from convert(chunk)
+            chunk_rows = _COMPACT_CHUNK_ROWS
+    return reduce(converted_rows())
+
+#load(compact=True)で一度に変換する行数
+_COMPACT_CHUNK_ROWS = 10000
+
+def _read_compact_columns(head, rows, convert, column_classes, chunk_rows=_COMPACT_CHUNK_ROWS):
+    """
+    ヘッダーまでの行(head)と残りの行(rows)から、各列をcolumn_classes(_ArrayColumn, _CategoryColumn)の
+    いずれかにした列のリストを返す(load(compact=True, categorize=True)の処理)
+        rowsはchunk_rows行ずつ変換して列毎に追加するので、全ての行のリストは作らない
+        どのクラスにもできない列は通常のリストにする
+        ※行の長さが揃っていない箇所は空('')で埋める
+    """
+    columns = []
+    row_len = 0
+    chunk = head + convert(list(islice(rows, chunk_rows)))
+    while chunk:
+        chunk_columns = row2column(chunk)
+        for col_idx in range(max(len(columns), len(chunk_columns))):
+            if col_idx < len(chunk_columns):
+                column = chunk_columns[col_idx]
+            else:
+                column = ['']*len(chunk)
+
+            if col_idx == len(columns): #新しい列(それまでの行は空('')で埋める)
+                column = ['']*row_len + column
+                columns.append(next(filter(None, (column_class.from_column(column) for column_class in column_classes)), column))
+            elif isinstance(columns[col_idx], list):
+                columns[col_idx].extend(column)
+            elif not columns[col_idx].extend(column):
+                columns[col_idx] = list(columns[col_idx]) + column #どのクラスにもできなくなったので通常のリストにする
+
+        row_len += len(chunk)
+        chunk = convert(list(islice(rows, chunk_rows)))
+
+    return columns
+
+def _file_obj2tda_iter(fileObj, sep=',', chunk_rows=10000, header_idx=None, dtypes=None, usecols=None):
+    """
+    ファイルオブジェクトからchunk_rows行ずつTwoDimArrayを読み出すジェネレータ
+        header_idx: 指定するとファイル先頭からヘッダーまでの行を各TwoDimArrayの先頭に付加する
+        dtypes, usecols: loadと同じ
+    """
+    if chunk_rows < 1:
+        raise ValueError(f'chunk_rowsは1以上を指定してください: {repr(chunk_rows)}')
+
+    head, rows, convert = _read_head(fileObj, sep=sep, header_idx=header_idx, dtypes=dtypes, usecols=usecols)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+
+        tda = TwoDimArray([row[:] for row in head] + convert(chunk)) #ヘッダー行は各TwoDimArrayで共有しないようにコピーする
+        _set_load_property(tda, fileObj, header_idx, len(head))
+        yield tda
+
+def _read_head(fileObj, sep=',', header_idx=None, dtypes=None, usecols=None):
+    """
+    ファイルオブジェクトの読み込み準備をする(_file_obj2tdaと_file_obj2tda_iterの共通処理)
+        ファイル先頭からヘッダーまでの行(header_idxが無ければ空)を読み込んで変換し、
+        (ヘッダーまでの行, 残りの行を順に返すイテレータ, 残りの行のリストを変換する関数)を返す
+        usecolsとdtypesの列の指定はヘッダーの値で解決する
+    """
+    rows = _split_rows(fileObj, sep=sep)
+
+    head = []
+    header = None
+    if header_idx is not None:
+        head = list(islice(rows, header_idx+1)) #ファイル先頭からヘッダーまでの行
+        if len(head) > header_idx:
+            header = head[header_idx]
+
+    col_idxs = None
+    if usecols is not None:
+        col_idxs = [_header_value2idx(header, col) for col in usecols]
+        select = _usecols_selector(col_idxs)
+        head = list(map(select, head))
+        rows = map(select, rows) #不要な列はファイルを読みながら捨てる
+
+    return (_str_field2int_or_float(head), rows, _dtypes_converter(header, dtypes, col_idxs))
+
+def _set_load_property(tda, fileObj, header_idx, head_len):
+    """
+    ファイルオブジェクトから読み出したTwoDimArrayのプロパティを設定する
+    """
+    tda.name = _file_obj_name(fileObj)
+    if header_idx is not None:
+        tda.header_idx = header_idx
+        tda.data_row_range = slice(head_len, None)
+
+def _header_value2idx(header, col):
+    """
+    ヘッダーの値、もしくは列インデックスで指定された列(col)の列インデックスを返す(usecolsとdtypesの列の指定用)
+    """
+    if isinstance(col, int):
+        return col
+
+    if header is None:
+        raise ValueError(f'ヘッダーの値で列を指定する場合はheader_idxを指定してください: {repr(col)}')
+    try:
+        return header.index(col)
+    except ValueError:
+        raise ValueError(f'ヘッダーに{repr(col)}がありません: {header}') from None
+
+def _usecols_selector(col_idxs):
+    """
+    行から列インデックス(col_idxs)の列だけを取り出したリストを返す関数を返す(行に無い列は空('')とする)
+    """
+    getter = itemgetter(*col_idxs) if col_idxs else (lambda row: ())
+    single = len(col_idxs) == 1
+
+    def select(row):
+        try:
+            fields = getter(row)
+        except IndexError: #列が足りない行
+            return [row[idx] if -len(row) <= idx < len(row) else '' for idx in col_idxs]
+        return [fields] if single else list(fields)
+    return select
+
+def _dtypes_converter(header, dtypes, col_idxs=None):
+    """
+    行のリストをdtypesで指定された型に列毎に変換する関数を返す
+        dtypesがNoneならば型を推定して変換する関数(_str_field2int_or_float)を返す
+        col_idxs: usecolsで選択した列のファイルの列インデックス(dtypesの列インデックスはファイルの列インデックス)
+    """
+    if dtypes is None:
+        return _str_field2int_or_float
+
+    converters = dict((_header_value2idx(header, col), _dtype2column_converter(dtype))
+                      for col, dtype in dtypes.items() if col is not None)
+    default = _dtype2column_converter(dtypes.get(None, str))
+
+    if col_idxs is not None:
+        col_converters = [converters.get(idx, default) for idx in col_idxs]
+        get_converter = lambda col_idx: col_converters[col_idx] if col_idx < len(col_converters) else default
+    else:
+        col_converters = list(converters.values())
+        get_converter = lambda col_idx: converters.get(col_idx, default)
+
+    if default is None and not any(col_converters):
+        return lambda tda_data: tda_data #全ての列がstrなので変換しない
+
+    def convert_column(col_idx, column):
+        converter = get_converter(col_idx)
+        return column if converter is None else converter(column)
+
+    return lambda tda_data: _convert_columns(tda_data, convert_column)
+
+def _dtype2column_converter(dtype):
+    """
+    dtypesで指定された型(dtype)に列を変換する関数を返す(strならば変換しないのでNoneを返す)
+    """
+    dtype = {'str': str, 'int': int, 'float': float}.get(dtype, dtype) if isinstance(dtype, str) else dtype
+    if dtype is str:
+        return None
+    elif dtype is int:
+        return _column2int
+    elif dtype is float:
+        return _column2float
+    elif dtype == 'money':
+        return lambda column: list(map(_chg_money2int_or_float, column))
+    elif dtype == 'auto':
+        return lambda column: _convert_column(column, _infer_dtype(column))
+    elif callable(dtype):
+        return lambda column: [dtype(field) if isinstance(field, str) and field else field for field in column]
+    else:
+        raise ValueError(f'dtypesの型の指定が不正です: {repr(dtype)}')
+
+#正規表現の特殊文字
+_REGEX_META = frozenset('.^$*+?{}[]\\|()')
+
+def _split_rows(fileObj, sep=','):
+    """
+    ファイルオブジェクトの各行をsepで区切り、各フィールドをstrip()したリストを順に返すジェネレータ
+        sep: セパレータは正規表現も指定可能
+
+        sepが正規表現ではない(文字列そのものの)場合はstr.splitで高速に区切る
+            1文字のセパレータならダブルクォートで囲まれたフィールド(RFC 4180)にも対応する('"a,b"' -> 'a,b', '""' -> '"')
+            ダブルクォートを含む行だけをcsvモジュール(C実装)で区切る(フィールド内の改行で複数行にまたがってもよい)
+        ※空白文字のセパレータ(タブなど)はダブルクォートに対応しない(行をstrip()してから区切る必要があるため)
+    """
+    if not _is_literal_sep(sep):
+        re_sep = re.compile(sep)
+        for row in fileObj:
+            yield [field.strip() for field in re_sep.split(row.strip())]
+        return
+
+    quoting = len(sep) == 1 and not sep.isspace() and sep != '"'
+    rows = iter(fileObj)
+    for row in rows:
+        if quoting and '"' in row:
+            #csvモジュールは必要な行だけをrowsから読み進めるので、フィールド内の改行で複数行にまたがっていても1行分となる
+            fields = next(_csv.reader(chain((row,), rows), delimiter=sep, skipinitialspace=True))
+            yield list(map(str.strip, fields)) if fields else ['']
+        else:
+            yield list(map(str.strip, row.strip().split(sep)))
+
+def _is_literal_sep(sep):
+    """
+    セパレータ(sep)が正規表現ではなく文字列そのものならTrueを返す
+        正規表現の特殊文字を含まない文字列、もしくは1文字の文字列('|'や'.'なども含む)を文字列そのものと判定する
+        (1文字の特殊文字は正規表現として使っても意味がないため)
+    """
+    return len(sep) == 1 or (bool(sep) and not _REGEX_META.intersection(sep))
+
+#圧縮形式と圧縮モジュール、拡張子
+_COMPRESSION_MODULES = {'gzip': gzip, 'bz2': bz2, 'xz': lzma}
+_COMPRESSION_EXTS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'xz'}
+_COMPRESSION_BUFFER_SIZE = 1 << 20 #圧縮したファイルを読み書きするバッファのサイズ
+
+def _compression_of(path, compression='infer'):
+    """
+    ファイル(path)の圧縮形式('gzip', 'bz2', 'xz', 圧縮していなければNone)を返す
+        compressionが'infer'ならばファイルの拡張子で決める
+    """
+    if compression == 'infer':
+        return _COMPRESSION_EXTS.get(os.path.splitext(os.fspath(path))[1].lower())
+    if compression is not None and compression not in _COMPRESSION_MODULES:
+        raise ValueError(f"compressionは{list(_COMPRESSION_MODULES)}か'infer', Noneを指定してください: {repr(compression)}")
+    return compression
+
+def _strip_compression_ext(path, compression='infer'):
+    """
+    圧縮したファイル(path)のファイル名から圧縮形式の拡張子を除いたファイル名を返す('out.html.gz' -> 'out.html')
+    """
+    root, ext = os.path.splitext(os.fspath(path))
+    if _compression_of(path, compression) is not None and _COMPRESSION_EXTS.get(ext.lower()) is not None:
+        return root
+    return os.fspath(path)
+
+def _open_text(path, mode='r', encoding=None, compression='infer'):
+    """
+    ファイル(path)をテキストモードで開く(open()と同じ)
+        圧縮したファイル(compression参照)はgzip, bz2, lzmaモジュールで展開・圧縮しながら読み書きする
+        (_COMPRESSION_BUFFER_SIZEのバッファでまとめて読み書きする)
+    """
+    compression = _compression_of(path, compression)
+    if compression is None:
+        return open(path, mode, encoding=encoding)
+
+    binary = _COMPRESSION_MODULES[compression].open(path, mode.replace('t', '') + 'b')
+    if 'r' in mode:
+        buffer = io.BufferedReader(binary, buffer_size=_COMPRESSION_BUFFER_SIZE)
+    else:
+        buffer = io.BufferedWriter(binary, buffer_size=_COMPRESSION_BUFFER_SIZE)
+    return _CompressedTextIO(buffer, os.fspath(path), encoding=encoding)
+
+class _CompressedTextIO(io.TextIOWrapper):
+    """
+    圧縮したファイルのテキストストリーム(nameで開いたファイル名を返す)
+        bz2, lzmaモジュールのファイルオブジェクトにはnameが無いため
+    """
+    def __init__(self, buffer, name, **kwargs):
+        super().__init__(buffer, **kwargs)
+        self._name = name
+
+    @property
+    def name(self):
+        return self._name
+
+def _file_obj_name(fileObj):
+    """
+    ファイルオブジェクトのファイル名を返す(ファイル名が無ければ空文字を返す)
+    """
+    if hasattr(fileObj, 'name'): #ファイルからデータを読み込んだ場合はファイル名が取得できる
+        return fileObj.name
+    else:
+        return ''
+
+#文字幅関係------------------------------
+def _max_widths(columns, grouping_opt=False, precision=6):
+    """
+    各列の最大文字列幅を返す
+    """
+    columns = _field2str(columns, grouping_opt, precision)
+    return [max(map(_width, col)) for col in columns]
+
+def _str_width_columns(rows, grouping_opt=False, precision=6):
+    """
+    行のリストを(列のリスト, 各フィールドの文字列(_field2str)の列のリスト, その文字列幅の列のリスト)にして返す
+    """
+    columns = row2column(rows)
+    str_columns = [_field2str([column], grouping_opt, precision)[0] for column in columns]
+    width_columns = [list(map(len, column)) if ''.join(column).isascii() else list(map(_width, column)) for column in str_columns]
+    return columns, str_columns, width_columns
+
+def _column_layout(width_column_chunks, header_aligns=None, aligns=None, widths=None, even_widths=False, col_num=0):
+    """
+    各列の(alignのリスト, ヘッダーのalignのリスト, widthのリスト)を返す(_fields_string_format, _uniform_line_chunks, iter_linesの共通処理)
+        width_column_chunks: 行のまとまり毎に、文字列幅の列のリスト(_str_width_columns)を順に返すイテラブル
+                             まとまり毎に各列の最大文字列幅を更新するので、全ての行を一度に持たなくてよい
+        header_aligns, aligns, widths: print_chg_formatと同じ書式指定(列インデックスで指定されていない列はNoneキーの設定)
+        even_widths: Trueならば各列のwidthを偶数にする(wrap_borderの枠用)
+        col_num: 列数の最小値
+    """
+    #各列の最大文字列幅
+    col_max_widths = [0]*col_num
+    for width_columns in width_column_chunks:
+        if len(width_columns) > len(col_max_widths):
+            col_max_widths.extend([0]*(len(width_columns) - len(col_max_widths)))
+        for col_idx, width_column in enumerate(width_columns):
+            width = max(width_column, default=0)
+            if width > col_max_widths[col_idx]:
+                col_max_widths[col_idx] = width
+
+    def col_settings(settings, default): #{列インデックス: 設定}をdefaultに上書きしたリスト
+        if settings is None or not isinstance(settings, dict):
+            return list(default)
+        other = settings.get(None)
+        return [settings.get(col_idx) if settings.get(col_idx) is not None else (other if other else value)
+                for col_idx, value in enumerate(default)]
+
+    col_aligns = col_settings(aligns, ['' for _ in col_max_widths]) #''はalign無し(デフォルトのalign設定が適用される)
+    h_aligns = col_settings(header_aligns, col_aligns) #初期設定はcol_aligns
+    if widths is not None and isinstance(widths, dict): #指定したwidthが最大文字列幅より大きい列だけ広げる
+        col_max_widths = [max(width, setting or 0) for width, setting in zip(col_max_widths, col_settings(widths, [0 for _ in col_max_widths]))]
+    if even_widths:
+        col_max_widths = [width if width%2 == 0 else width+1 for width in col_max_widths]
+    return col_aligns, h_aligns, col_max_widths
+
+def _cell_formatter(align, width, grouping_opt=False, precision=6):
+    """
+    列の書式関数を返す(_fields_string_formatの処理)
+        書式関数は(フィールド, フィールドの文字列(_field2str), その文字列幅)を受け取り、alignで文字列幅widthまで空白で埋めた文字列を返す
+        (f'{field:{align}{width}{grouping_option}{.precision f}}'と同じ文字列になる)
+        '<', '>', '^'(と無指定)のalignはフィールドの文字列を直接埋めるので、書式指定文字列を作り直さない
+        それ以外のalign(埋める文字の指定など)とint, floatのサブクラス(boolなど)はフィールド毎にformatで書式指定する
+    """
+    grouping_option = '_' if grouping_opt else '' #アンダースコア以外にカンマも設定可能だがcsvの区切り文字と同じなのでカンマは使用しない
+
+    def format_field(field, field_str, field_width):
+        field_width = width - _count_em(str(field))
+        if field_width <= 0:
+            #fieldが空だとwidthがゼロになるが、
+            #書式指定文字列の指定でalignが空('')で、かつ、widthがゼロだとValueErrorとなる
+            #そのためwidthがゼロの場合は空('')を返す
+            field_width = ''
+        if isinstance(field, float):
+            return f'{field:{align}{field_width}{grouping_option}.{precision}f}'
+        if isinstance(field, int):
+            return f'{field:{align}{field_width}{grouping_option}}'
+        if not isinstance(field, str):
+            field = str(field)
+        return f'{field:{align}{field_width}}'
+
+    if align not in ('', '<', '>', '^'):
+        return format_field
+
+    def pad_field(field, field_str, field_width):
+        field_type = type(field)
+        if field_type is str:
+            number = False
+        elif field_type is int or field_type is float:
+            number = True
+        elif isinstance(field, (int, float)):
+            return format_field(field, field_str, field_width)
+        else:
+            number = False
+
+        pad = width - field_width
+        if pad <= 0:
+            return field_str
+        if align == '<' or (not align and not number): #文字列の無指定は左詰め
+            return field_str + ' '*pad
+        if align == '>' or not align: #数値の無指定は右詰め
+            return ' '*pad + field_str
+        left = pad//2 #中央寄せで余る空白は右に付ける
+        return ' '*left + field_str + ' '*(pad - left)
+
+    return pad_field
+
+def _format_column(column, str_column, width_column, align, width, grouping_opt=False, precision=6):
+    """
+    列(column)の各フィールドをalignで文字列幅widthまで空白で埋めた文字列のリストを返す(_fields_string_formatの処理)
+        str_column, width_column: 各フィールドの文字列(_field2str)とその文字列幅
+        str, int, floatだけの列で'<', '>', '^'(と無指定)のalignならば、列全体をまとめて埋める
+        (ASCII文字だけの列はstr.ljust, str.rjustで埋める)
+        それ以外は各フィールドを列の書式関数(_cell_formatter)で埋める
+    """
+    field_types = set(map(type, column))
+    if align in ('', '<', '>', '^') and field_types <= {str, int, float}:
+        if align == '':
+            if field_types <= {int, float}:
+                align = '>' #数値の無指定は右詰め
+            elif str in field_types and len(field_types) == 1:
+                align = '<' #文字列の無指定は左詰め
+        if sum(width_column) == sum(map(len, str_column)): #ASCII文字だけの列
+            if align == '':
+                return [field_str.ljust(width) if field.__class__ is str else field_str.rjust(width) for field, field_str in zip(column, str_column)]
+            if align == '<':
+                return [field_str.ljust(width) for field_str in str_column]
+            if align == '>':
+                return [field_str.rjust(width) for field_str in str_column]
+            return [f'{field_str:^{width}}' for field_str in str_column]
+
+    formatter = _cell_formatter(align, width, grouping_opt, precision)
+    return list(map(formatter, column, str_column, width_column))
+
+def _border_row_segments(pattern_row_len, data_row_num):
+    """
+    data_row_num行のデータを囲む枠の行が、枠パターンのどの行を使うかを表す区間のリスト[(開始位置, 終了位置, 枠パターンの行インデックス), ...]を返す
+        区間の位置posの枠の行は、枠パターンの行インデックス[(pos-開始位置) % len(枠パターンの行インデックス)]の行
+        枠パターンより行が多い場合は、中心線の上の行、下の行の順で繰り返す区間になる(枠パターン参照)
+        区間で表すので、表の行数に関係なく一部の枠の行だけを作ったり(_border_rows)、数えたり(_count_border_rows)できる
+    """
+    c = pattern_row_len//2
+    if c == data_row_num: #同じ大きさ
+        parts = [(pattern_row_len, range(pattern_row_len))]
+    elif c > data_row_num: #データが枠パターンより小さい
+        parts = [(data_row_num*2, range(data_row_num*2)), (1, (pattern_row_len-1,))]
+    else: #データが枠パターンより大きい
+        row_increase = data_row_num - c
+        parts = [(c, range(c)),
+                 ((row_increase//2 + row_increase%2)*2, (c, c-1)),
+                 (1, (c,)),
+                 ((row_increase//2)*2, (c+1, c)),
+                 (pattern_row_len-c-1, range(c+1, pattern_row_len))]
+
+    segments = []
+    start = 0
+    for length, row_idxs in parts:
+        if length > 0:
+            segments.append((start, start+length, row_idxs))
+            start += length
+    return segments
+
+@functools.lru_cache(maxsize=64)
+def _border_template(pattern, data_col_num):
+    """
+    枠パターンの文字列(pattern)を列数(data_col_num)に合わせてコンパイルした_BorderTemplateを返す
+        枠パターンの文字列と列数毎にキャッシュするので、同じ枠で何度囲んでも枠パターンを解析し直さない
+        (キーは枠パターンの文字列なので、border_patternsの枠パターンを変更・追加しても使える)
+    """
+    return _BorderTemplate(pattern, data_col_num)
+
+def _border_rows(segments, pattern_rows, start, stop):
+    """
+    区間のリスト(_border_row_segments参照)の位置[start:stop]の枠の行(pattern_rowsの行)を順に返すジェネレータ
+    """
+    for seg_start, seg_stop, row_idxs in segments:
+        for pos in range(max(start, seg_start), min(stop, seg_stop)):
+            yield pattern_rows[row_idxs[(pos-seg_start) % len(row_idxs)]]
+
+def _count_border_rows(segments, start, stop, counted):
+    """
+    区間のリスト(_border_row_segments参照)の位置[start:stop]の枠の行のうち、counted[枠パターンの行インデックス]が真の行数を返す
+        繰り返す区間は偶数番目と奇数番目の位置の数から求めるので、位置を1つずつ数えない
+    """
+    count = 0
+    for seg_start, seg_stop, row_idxs in segments:
+        lo, hi = max(start, seg_start), min(stop, seg_stop)
+        if lo >= hi:
+            continue
+        if len(row_idxs) == 2:
+            even_num = (hi-seg_start+1)//2 - (lo-seg_start+1)//2 #区間の偶数番目の位置の数
+            count += even_num*counted[row_idxs[0]] + (hi-lo-even_num)*counted[row_idxs[1]]
+        else:
+            count += sum(counted[row_idxs[(pos-seg_start) % len(row_idxs)]] for pos in range(lo, hi))
+    return count
+
+def _width(string):
+    """
+    全角文字の文字幅を2として文字列幅を算出する
+    """
+    if string.isascii(): #ASCII文字だけならば文字数
+        return len(string)
+    return len(string) + _count_non_ascii_em(string, _em_pattern(tuple(en_table)))
+
+def _count_em(string):
+    """
+    全角文字の文字数を返す
+    """
+    if string.isascii():
+        return 0
+    return _count_non_ascii_em(string, _em_pattern(tuple(en_table)))
+
+@functools.lru_cache(maxsize=1<<16)
+def _count_non_ascii_em(string, em_pattern):
+    """
+    ASCII以外の文字を含む文字列の全角文字の文字数を返す(同じ文字列の結果はキャッシュする)
+        em_pattern: BMP(U+0000-U+FFFF)の全角文字の正規表現(_em_pattern参照)
+                    en_tableが変わるとem_patternも変わるので、古いen_tableでの結果は使わない
+        BMP以外の文字(絵文字など)は1文字ずつ_is_emで判定する
+    """
+    count = len(em_pattern.findall(string))
+    if max(string) > '\uffff':
+        count += sum([1 for char in string if char > '\uffff' and _is_em(char)])
+    return count
+
+@functools.lru_cache(maxsize=8)
+def _em_pattern(en_chars):
+    """
+    BMPの全角文字(_bmp_em_table)からen_chars(en_tableの文字)を除いた文字の正規表現を返す
+    """
+    table = bytearray(_bmp_em_table())
+    for char in en_chars:
+        if len(char) == 1 and ord(char) <= 0xffff:
+            table[ord(char)] = 0
+
+    ranges = [] #全角文字が続く範囲[start, stop)
+    start = None
+    for code, em in enumerate(chain(table, (0,))):
+        if em and start is None:
+            start = code
+        elif not em and start is not None:
+            ranges.append(f'{re.escape(chr(start))}-{re.escape(chr(code-1))}')
+            start = None
+    return re.compile(f'[{"".join(ranges)}]' if ranges else '(?!)')
+
+@functools.lru_cache(maxsize=1)
+def _bmp_em_table():
+    """
+    BMPの各文字が全角文字(en_tableを考慮しない_is_emの判定)ならば1、そうでなければ0のバイト列を返す(最初に使う時に作る)
+    """
+    return bytes([unicodedata.east_asian_width(chr(code)) in ('F', 'W', 'A') for code in range(0x10000)])
+
+en_table = [
+'═', '║', '╔','╗', '╚', '╝', '╠', '╣', '╦', '╩', '╬', #Double
+'·', '╭', '╮', '╯', '╰', #Rcorner
+'♠', '♥', '♦', '♣', '♤', '♡', '♢', '♧', #Suit
+]
+
+def _is_em(char):
+    """
+    全角文字ならTrueを返す
+    """
+    #------------------------------------------------------------
+    #文字判定: F: Fullwidth(全角) - 全角英数字
+    #          W: Wide(広) - 漢字や仮名文字など
+    #          A: Ambiguous(曖昧) - 記号など(全角/半角が交じっている)
+    #
+    # ※使いたい枠(罫線)がAグループなのでAも全角文字として扱う
+    #   このためAグループの半角文字を使用した場合は誤判定して
+    #   位置ズレの原因となるため注意すること
+    #   (Aグループでもen_tableに登録した文字は半角として判定する)
+    #------------------------------------------------------------
+    data = unicodedata.east_asian_width(char)
+    if data in ('F', 'W'):
+        return True
+    elif data in ('A',) and char not in en_table:
+        return True
+
+    return False
 
 #フィールド変換------------------------------
 def _field2str(tda_data, grouping_opt=False, precision=6):
@@ -1975,7 +5018,8 @@ def _field2str(tda_data, grouping_opt=False, precision=6):
     if grouping_opt:
         grouping_option = '_'
 
-    return [[f'{field:{grouping_option}}' if isinstance(field, int) else f'{field:{grouping_option}.{precision}f}' if isinstance(field, float) else str(field) for field in row]
+    return [[field if field.__class__ is str else f'{field:{grouping_option}}' if isinstance(field, int) else f'{field:{grouping_option}.{precision}f}' if isinstance(field, float) else str(field)
+             for field in row]
             for row in tda_data]
 
 def _field2striped_str(tda_data):
@@ -1984,11 +5028,142 @@ def _field2striped_str(tda_data):
     """
     return [[_chg_striped_str(field) for field in row] for row in tda_data]
 
+def _multiple_lines_rows(row, multiple_lines_delimiter):
+    """
+    一行表現のmultiple-linesを含む行(row)を複数行表現の行のリストに展開する(multiple-linesが無ければ[row]を返す)
+        _extend_multiple_linesと同じ展開を1行ずつ行う
+    """
+    if not any(isinstance(field, str) and multiple_lines_delimiter in field for field in row):
+        return [row]
+    fields = [[_str2int_or_float(line) for line in field.split(multiple_lines_delimiter)]
+              if isinstance(field, str) and multiple_lines_delimiter in field else [field] for field in row]
+    return [list(line) for line in zip_longest(*fields, fillvalue='')]
+
+def _save_field_value(field, quoting=False):
+    """
+    save(uniform=True)で書式指定するフィールドの値を返す
+        str, int, float以外はstrにし、quotingがTrueならば文字列をダブルクォートで囲む(_quote_field参照)
+    """
+    if not isinstance(field, (str, int, float)):
+        field = str(field)
+    if quoting and isinstance(field, str):
+        return _quote_field(field)
+    return field
+
+def _quote_field(field):
+    """
+    カンマ、ダブルクォート、改行を含む文字列(field)をダブルクォートで囲む(RFC 4180, フィールド内のダブルクォートは""にする)
+    """
+    if _NEED_QUOTE.search(field):
+        return '"' + field.replace('"', '""') + '"'
+    return field
+
+_NEED_QUOTE = re.compile(r'[,"\r\n]')
+
+_SAVE_CHUNK_ROWS = 10000 #saveで1度に文字列にして書き込む行数
+
 def _str_field2int_or_float(tda_data):
     """
     TwoDimArrayのフィールドでintに変換できる文字列はintに、floatに変換できる文字列はfloatに変換
+        列毎に型を推定して列単位で一括変換する(_convert_column参照)
+    """
+    return _convert_columns(tda_data, lambda col_idx, column: _convert_column(column, _infer_dtype(column)))
+
+def _convert_columns(tda_data, convert_column):
+    """
+    TwoDimArrayの各列をconvert_column(列インデックス, 列)で変換する
+        ※行の長さが揃っていなくても、元の行の長さは変えない
+    """
+    if not tda_data:
+        return tda_data
+
+    if len(set(map(len, tda_data))) == 1:
+        columns = [convert_column(col_idx, col) for col_idx, col in enumerate(map(list, zip(*tda_data)))]
+        return [list(row) for row in zip(*columns)]
+
+    #行の長さが揃っていない場合は、欠けている箇所に目印(_MISSING)を入れて列に変換し、行に戻すときに取り除く
+    columns = zip_longest(*tda_data, fillvalue=_MISSING)
+    columns = [convert_column(col_idx, col) for col_idx, col in enumerate(map(list, columns))]
+    return [[field for field in row if field is not _MISSING] for row in zip(*columns)]
+
+#_convert_columnsで行の長さが揃っていない箇所を示す目印
+_MISSING = object()
+
+#_infer_dtypeで型の推定に使うフィールドの数
+_DTYPE_SAMPLE_SIZE = 100
+
+def _infer_dtype(column, sample_size=_DTYPE_SAMPLE_SIZE):
     """
-    return [[_str2int_or_float(field) for field in row] for row in tda_data]
+    列(column)の型(int, float, str)を推定する
+        列全体から等間隔にsample_size個のフィールドを取り出し、空('')以外のフィールドで最も多い型を返す
+        intとfloatが混在していればfloatとする(ヘッダーなど少数の文字列は無視される)
+        文字列のフィールドはintやfloatに変換できるならばその型として数える
+    """
+    step = max(1, len(column) // sample_size)
+    counter = Counter(_field_dtype(field) for field in column[::step] if field != '' and field is not _MISSING)
+
+    num = counter[int] + counter[float]
+    if num == 0 or counter[str] >= num:
+        return str
+    elif counter[float]:
+        return float
+    else:
+        return int
+
+def _field_dtype(field):
+    """
+    フィールドの型(int, float, str)を返す
+        文字列はintやfloatに変換できるならばその型を返す
+    """
+    field_type = type(field)
+    if field_type is int or field_type is float:
+        return field_type
+    elif field_type is str:
+        if _is_int_str(field):
+            return int
+        elif _FLOAT_STR.fullmatch(field):
+            return float
+    return str
+
+def _convert_column(column, dtype):
+    """
+    列(column)のフィールドでintに変換できる文字列はintに、floatに変換できる文字列はfloatに変換したリストを返す
+        dtype(_infer_dtypeで推定した列の型)に合わせた方法で列単位で一括変換する
+            ・int: 列全体をint()で一括変換する(失敗したらフィールド毎に変換する)
+            ・str: 数字の文字列ではないフィールドは変換を試みない
+        型の合わないフィールドもフィールド毎に_str2int_or_floatで正しく変換される
+    """
+    if not all(field_type is str for field_type in set(map(type, column))):
+        return list(map(_str2int_or_float, column)) #文字列以外のフィールドが混ざっている
+
+    if dtype is int:
+        try:
+            return list(map(int, column))
+        except ValueError:
+            pass
+    elif dtype is str:
+        fullmatch = _NUM_CANDIDATE.fullmatch
+        return [_str2int_or_float(field) if fullmatch(field) else field for field in column]
+
+    return list(map(_str2int_or_float, column))
+
+def _column2int(column):
+    """
+    列(column)のフィールドでintに変換できる文字列はintに変換したリストを返す
+    """
+    try:
+        return list(map(int, column))
+    except (ValueError, TypeError): #変換できないフィールドがある
+        return list(map(_str2int, column))
+
+def _column2float(column):
+    """
+    列(column)のフィールドでfloatに変換できる文字列はfloatに変換したリストを返す
+    """
+    try:
+        return list(map(float, column))
+    except (ValueError, TypeError): #変換できないフィールドがある
+        return list(map(_str2float, column))
 
 #文字列変換------------------------------
 def _str2striped_str(string):
@@ -2012,15 +5187,41 @@ def _str2float(string):
 def _str2int_or_float(string):
     """
     文字列からintに変換できたらintに、文字列からfloatに変換できたらfloatに変換する
+        よくある形式の数字の文字列は例外を発生させずに判定して変換する
+        それ以外は数字の文字列と思われるものだけint()とfloat()で変換を試みる
     """
-    if isinstance(string, str):
-        string = _str2int(string)
+    if not isinstance(string, str):
+        return string
 
+    if _is_int_str(string):
+        return int(string)
+    elif _FLOAT_STR.fullmatch(string):
+        return float(string)
+    elif not _NUM_CANDIDATE.fullmatch(string):
+        return string #int()やfloat()で変換できる文字列ではない
+
+    string = _str2int(string)
     if isinstance(string, str):
         string = _str2float(string)
 
     return string
 
+#int()で必ず変換できる文字列の最大長(桁数が多すぎるとint()はValueErrorとなるため)
+_INT_STR_MAX_LEN = 4000
+
+def _is_int_str(string):
+    """
+    int()で必ず変換できるASCIIの整数文字列ならTrueを返す('123', '-45', '+6')
+    """
+    digits = string[1:] if string[:1] in ('+', '-') else string
+    return digits.isdigit() and digits.isascii() and len(digits) <= _INT_STR_MAX_LEN
+
+#int()では変換できず、float()で必ず変換できるASCIIの小数文字列('1.5', '-.5', '1e-3')
+_FLOAT_STR = re.compile(r'[+-]?(?:(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+)', re.ASCII)
+
+#int()やfloat()で変換できる可能性のある文字列(数字と'_', '.', 'e', 符号だけの文字列、'inf'や'nan')
+_NUM_CANDIDATE = re.compile(r'\s*[+-]?(?:[\d_.e+-]*\d[\d_.e+-]*|inf|infinity|nan)\s*', re.IGNORECASE)
+
 #変換------------------------------
 def _chg_striped_str(something):
     return str(something).strip()
@@ -2070,6 +5271,17 @@ def _chg_money2float(something):
     else:
         return something
 
+def _chg_money2int_or_float(something):
+    """
+    通貨文字列をintに変換できたらintに、floatに変換できたらfloatに変換する
+    """
+    if isinstance(something, str) and money.match(something):
+        value = _str2int_or_float(something.translate(str.maketrans('', '', del_money_symbol)))
+        if not isinstance(value, str):
+            return value
+
+    return something
+
 #--------------------------------------------------------------------------------
 # 枠パターン
 #--------------------------------------------------------------------------------